@@ -1,99 +1,201 @@
-import json
+import argparse
 import os  # 用于处理文件路径
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+import numpy as np
+from instance_io import iter_instances  # 流式读取实例，逐个产出
+from solution_io import read_solution  # 读取 json / compact / binary 格式的解
 
-def read_json(json_file_path):
-    with open(json_file_path, 'r') as file:
-        instances = json.load(file)
-    return instances
+# 各实例目前已知的最好箱子数（与 CW_ins.json 中实例顺序一致）
+BEST_KNOWN = [
+    52,
+    59,
+    24,
+    27,
+    47,
+    49,
+    36,
+    52,
+    417,
+    375
+]
 
-if __name__ == "__main__":
-     # 确定脚本真正所在的目录：
-    script_dir     = os.path.dirname(os.path.abspath(__file__))
-    instances_path = os.path.join(script_dir, 'CW_ins.json')
-    solution_path  = os.path.join(script_dir, '20513824_Yuanhao_Dai.json')
-
-    instances = read_json(instances_path)
-    solution  = read_json(solution_path)
-
-    best_known = [
-        52,
-        59,
-        24,
-        27,
-        47,
-        49,
-        36,
-        52,
-        417,
-        375
-    ]
-
-    # check 
+TIME_LIMIT = 300
+
+# 把一个结果记录展开成 (物品尺寸数组, 每个物品所在箱子编号数组, 箱子数)
+# json 记录的解是箱子列表；compact/binary 记录直接给出第 k 个物品所在的箱子编号
+def flatten(items, res):
+    try:
+        if 'bins' in res:
+            ids = np.asarray(res['bins'], dtype=np.int64)
+            # 合法的解箱子数不会超过物品数；编号越界直接判为格式错误，免得按编号分配巨大的数组
+            if ids.ndim != 1 or len(ids) != len(items) or (len(ids) and (ids.min() < 0 or ids.max() >= len(ids))):
+                return None, None, 0
+            return np.asarray(items, dtype=np.int64), ids, int(ids.max()) + 1 if len(ids) else 0
+        sol = res['solution']
+        lens = np.fromiter(map(len, sol), dtype=np.int64, count=len(sol))
+        sizes = np.fromiter(chain.from_iterable(sol), dtype=np.int64, count=int(lens.sum()))
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None, None, 0
+    ids = np.repeat(np.arange(len(sol)), lens)
+    return sizes, ids, len(sol)
+
+# 校验一个实例的解，返回 (错误信息列表, 箱子数)
+# 容量：按箱子编号对物品尺寸做 bincount 求每箱负载；
+# 物品完整性：对物品尺寸计数后逐项比较，两者都是 O(n)；
+# 解里出现比实例最大物品还大的尺寸时直接判错，计数数组的长度只取决于实例本身
+def check_solution(items, capacity, res):
+    sizes, ids, bin_num = flatten(items, res)
+    if sizes is None:
+        return ["Solution format error!"], 0
+    errors = []
+    loads = np.bincount(ids, weights=sizes, minlength=bin_num)
+    if len(loads) and loads.max() > capacity:
+        errors.append("Capacity error!")
+    items = np.asarray(items, dtype=np.int64)
+    if len(sizes) != len(items) or (len(sizes) and sizes.min() < 0):
+        errors.append("Item list error!")
+    elif len(items) and sizes.max() > items.max():
+        errors.append("Item list error!")
+    elif len(items):
+        top = int(items.max()) + 1
+        if not np.array_equal(np.bincount(items, minlength=top), np.bincount(sizes, minlength=top)):
+            errors.append("Item list error!")
+    return errors, bin_num
+
+def score(bin_num, bk):
+    gap  = bin_num - bk
+    mark = 0
+    bonus = 0
+    if gap < 0:
+        bonus = 3
+        mark  = 3
+    elif gap == 0:
+        mark = 3
+    elif gap <= 1:
+        mark = 2
+    elif gap <= 2:
+        mark = 1
+    elif gap <= 3:
+        mark = 0.5
+    return mark, bonus
+
+# 给一个解文件评分，返回 (输出文本行, 汇总)；不直接打印，方便在子进程中运行
+def grade(solution_path, instances):
+    lines = []
+    summary = {'file': solution_path, 'bins': 0, 'mark': 0, 'bonus': 0, 'passed': True, 'time': 0}
     passed = True
-    if solution.get('time', float('inf')) > 300:
-        print("Time exceed limit!")
+    try:
+        solution = read_solution(solution_path)
+    except (OSError, ValueError):
+        solution = {}
+    if not isinstance(solution, dict) or not isinstance(solution.get('res'), list):
+        solution = {}
+    results = solution.get('res', [])
+
+    if not solution:
+        lines.append("Unreadable solution file!")
+        passed = False
+    elif 'time' not in solution:
+        # 运行中断时结果文件里只有已解完的实例，没有总耗时
+        lines.append(f"Incomplete solution file! ({len(results)} instances written)")
+        passed = False
+    elif solution['time'] > TIME_LIMIT:
+        lines.append("Time exceed limit!")
         passed = False
     else:
-        results = solution['res']
-        total_bin_num = 0
-        total_mark    = 0
-        total_bonus   = 0
-
-        for ins, res, bk in zip(instances, results, best_known):
-            items    = ins['items']
-            capacity = ins['capacity']
-            name     = ins['name']
-
-            sol       = res['solution']
-            sol_items = []
-            bin_num   = len(sol)
+        for ins, res, bk in zip(instances, results, BEST_KNOWN):
+            name = ins['name']
+            if not isinstance(res, dict):
+                res = {}
 
             # 名称校验
             if name != res.get('name', ''):
-                print(f"\n--- Error ---\nInstance: {name}\tInstance name error!\n")
+                lines.append(f"\n--- Error ---\nInstance: {name}\tInstance name error!\n")
                 passed = False
 
-            # 容量校验 & 收集所有放入的物品
-            for b in sol:
-                if sum(b) > capacity:
-                    print(f"\n--- Error ---\nInstance: {name}\tCapacity error!\n")
-                    passed = False
-                sol_items += b
-
-            # 物品完整性校验
-            if sorted(items) != sorted(sol_items):
-                print(f"\n--- Error ---\nInstance: {name}\tItem list error!\n")
+            # 容量 & 物品完整性校验
+            errors, bin_num = check_solution(ins['items'], ins['capacity'], res)
+            for e in errors:
+                lines.append(f"\n--- Error ---\nInstance: {name}\t{e}\n")
                 passed = False
 
-            # 评分逻辑
-            gap  = bin_num - bk
-            mark = 0
-            bonus = 0
-            if gap < 0:
-                bonus = 3
-                mark  = 3
-            elif gap == 0:
-                mark = 3
-            elif gap <= 1:
-                mark = 2
-            elif gap <= 2:
-                mark = 1
-            elif gap <= 3:
-                mark = 0.5
-
-            print(f"Instance: {name}\tMark: {mark}\tBonus: {bonus}\tBins used/Best known: {bin_num}/{bk}")
-            total_bin_num += bin_num
-            total_mark    += mark
-            total_bonus   += bonus
-
-    # 打印总结
-    print("\n--- Summary ---")
-    print(f"Total Bin:    {total_bin_num}")
-    print(f"Run Time:     {round(solution.get('time',0),2)} s")
+            mark, bonus = score(bin_num, bk)
+            lines.append(f"Instance: {name}\tMark: {mark}\tBonus: {bonus}\tBins used/Best known: {bin_num}/{bk}")
+            summary['bins']  += bin_num
+            summary['mark']  += mark
+            summary['bonus'] += bonus
+
+    # 总结
+    summary['time'] = solution.get('time', 0)
+    summary['passed'] = passed
+    lines.append("\n--- Summary ---")
+    lines.append(f"Total Bin:    {summary['bins']}")
+    lines.append(f"Run Time:     {round(summary['time'],2)} s")
     if passed:
-        print(f"Bonus mark:   {total_bonus}")
-        print(f"Total mark:   {total_mark + total_bonus} / 30")
-        print("Passed")
+        lines.append(f"Bonus mark:   {summary['bonus']}")
+        lines.append(f"Total mark:   {summary['mark'] + summary['bonus']} / 30")
+        lines.append("Passed")
     else:
-        print("Total mark:   0 / 30")
-        print("Failed")
+        lines.append("Total mark:   0 / 30")
+        lines.append("Failed")
+    return lines, summary
+
+# 子进程各自读一次实例文件，之后评分的每个解文件都复用
+_instances = None
+
+def _init_worker(instances_path):
+    global _instances
+    _instances = list(iter_instances(instances_path, as_numpy=True))
+
+def _grade_worker(solution_path):
+    return grade(solution_path, _instances)
+
+# 参数可以是解文件或目录（目录下的所有文件都参与评分）
+def collect_paths(paths):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files += sorted(os.path.join(p, f) for f in os.listdir(p)
+                            if not f.startswith('.') and os.path.isfile(os.path.join(p, f)))
+        else:
+            files.append(p)
+    return files
+
+def main():
+    # 确定脚本真正所在的目录：
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Grade bin packing solution files against CW_ins.json')
+    parser.add_argument('paths', nargs='*', default=[os.path.join(script_dir, '20513824_Yuanhao_Dai.json')],
+                        help='solution files or directories of solution files')
+    parser.add_argument('--instances', default=os.path.join(script_dir, 'CW_ins.json'))
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    files = collect_paths(args.paths)
+    # 单个文件：输出与原来一致
+    if len(files) == 1:
+        _init_worker(args.instances)
+        lines, _ = _grade_worker(files[0])
+        print("\n".join(lines))
+        return
+
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(files)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(args.instances,)) as pool:
+        reports = list(pool.map(_grade_worker, files, chunksize=max(1, len(files) // (4 * workers))))
+
+    for path, (lines, _) in zip(files, reports):
+        print(f"\n===== {path} =====")
+        print("\n".join(lines))
+
+    # 所有文件的总表：通过的在前，按总分从高到低、箱子数从少到多排列
+    print("\n--- Overall ---")
+    summaries = [s for _, s in reports]
+    for s in summaries:
+        s['total'] = s['mark'] + s['bonus'] if s['passed'] else 0
+    for s in sorted(summaries, key=lambda s: (not s['passed'], -s['total'], s['bins'])):
+        print(f"{s['total']:>5} / 30\t{'Passed' if s['passed'] else 'Failed'}\tBins: {s['bins']}\t{s['file']}")
+
+if __name__ == "__main__":
+    main()
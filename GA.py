@@ -1,106 +1,140 @@
-import json
+import argparse
 import random
 import time
 import os
-from datetime import datetime
+import numpy as np
+from packing import best_fit
+from instance_io import iter_instances
+from bounds import lower_bound
+from solution_io import FORMATS, SolutionWriter, WarmStart, solution_order
+from eval_cache import EvalCache
+from instrument import count, timer, track_instance, write_report
+from checkpoint import InstanceCheckpoint, RunClock, checkpoint_dir, clear_checkpoints
 
 # 开始计时
 t0 = time.time()
 
 def read_bin_packing_instances(json_file_path):
-    with open(json_file_path, 'r') as f:
-        return json.load(f)
+    return iter_instances(json_file_path)
 
-# Best Fit 解码（无需排序）
-def best_fit(items, capacity):
-    bins = []
-    contents = []
-    for x in items:
-        idx = -1
-        min_space = capacity + 1
-        for i, used in enumerate(bins):
-            space = capacity - used
-            if space >= x and space < min_space:
-                idx, min_space = i, space
-        if idx >= 0:
-            bins[idx] += x
-            contents[idx].append(x)
-        else:
-            bins.append(x)
-            contents.append([x])
-    return contents
-
-# 计算某个排列的箱子数（适应度低则好）
-def decode_and_count(indiv, items, capacity):
-    permuted = [items[i] for i in indiv]
-    sol = best_fit(permuted, capacity)
+# 计算某个排列的箱子数（适应度低则好）；cache 命中时直接返回缓存的解
+def decode_and_count(indiv, items, capacity, cache=None):
+    permuted = items[indiv]
+    if cache is not None:
+        key = cache.key(permuted, capacity, 'ga')
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1], entry[0]
+    sol = best_fit(permuted.tolist(), capacity)
+    if cache is not None:
+        cache.put(key, len(sol), sol)
     return sol, len(sol)
 
-# 轮盘赌选择
-def roulette_wheel_select(population, scores):
-    total = sum(scores)
+# 轮盘赌选择（批量）：对分数做前缀和，一次 searchsorted 选出 k 个个体的行号
+def roulette_wheel_select(scores, k, rng):
+    cum = np.cumsum(scores, dtype=np.float64)
+    total = cum[-1]
     if total == 0:
-        return random.choice(population)
-    pick = random.uniform(0, total)
-    cum = 0
-    for indiv, score in zip(population, scores):
-        cum += score
-        if cum >= pick:
-            return indiv
-    return population[-1]
+        return rng.integers(0, len(scores), size=k)
+    picks = rng.uniform(0, total, size=k)
+    return np.minimum(np.searchsorted(cum, picks, side='left'), len(scores) - 1)
 
-# 单点交叉 + 简单修复为排列
-def crossover(parent1, parent2):
-    n = len(parent1)
-    pt = random.randint(1, n-1)
-    child = parent1[:pt] + [g for g in parent2 if g not in parent1[:pt]]
-    return child
+# 单点顺序交叉（批量）：子代 = parent1[:pt] + parent2 中不在该前缀里的基因（保持顺序）
+# 用布尔掩码标记前缀基因、用前缀和算出剩余基因的落点，每个子代 O(n)
+def crossover(parent1, parent2, rng):
+    m, n = parent1.shape
+    pts = rng.integers(1, n, size=m)
+    cols = np.arange(n)
+    in_prefix = cols < pts[:, None]
+    # taken[r, g] = 基因 g 是否出现在 parent1[r] 的前缀中
+    taken = np.zeros((m, n), dtype=bool)
+    np.put_along_axis(taken, parent1, in_prefix, axis=1)
+    keep = ~np.take_along_axis(taken, parent2, axis=1)
+    # 保留下来的 parent2 基因依次放到 pt, pt+1, ...；其余写进多出来的一列后丢弃
+    dest = np.where(keep, pts[:, None] + np.cumsum(keep, axis=1) - 1, n)
+    child = np.empty((m, n + 1), dtype=parent1.dtype)
+    child[:, :n] = parent1
+    np.put_along_axis(child, dest, parent2, axis=1)
+    return child[:, :n]
 
-# 交换变异
-def mutate(indiv):
-    a, b = random.sample(range(len(indiv)), 2)
-    indiv[a], indiv[b] = indiv[b], indiv[a]
+# 交换变异（批量）：被选中的行各自随机交换两个不同位置
+def mutate(population, rows, rng):
+    n = population.shape[1]
+    if len(rows) == 0 or n < 2:
+        return
+    a = rng.integers(0, n, size=len(rows))
+    b = (a + rng.integers(1, n, size=len(rows))) % n
+    va = population[rows, a]
+    population[rows, a] = population[rows, b]
+    population[rows, b] = va
 
-# 遗传算法主过程
+# 遗传算法主过程：种群为 (pop_size, n) 的 int32 矩阵，每行是一个物品下标排列
+# 最优个体的箱子数达到 lower_bound（已证明最优）时立即停止
+# cache 为 EvalCache 时，未变化的个体（直接复制的父代等）不再重复解码
+# checkpoint 为 InstanceCheckpoint 时定期把种群、最优个体、代数和随机数发生器状态存到 'ga' 字段，续跑时从中恢复
+# initial 为已有的解（热启动）时，它就是初始最优解，并按箱子顺序排成排列放进种群的前 1/10（除第一个外各做一次交换变异）
 def genetic_fit(items, capacity,
                 pop_size=100, generations=500,
                 crossover_rate=0.8, mutation_rate=0.1,
-                time_limit=60):
+                time_limit=60, seed=None, lower_bound=0, cache=None, checkpoint=None, initial=None):
+    # 未指定种子时从 random 取，保证 random.seed 仍能复现整个运行
+    rng = np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+    items = np.asarray(items, dtype=np.int32)
     n = len(items)
-    # 初始化种群：随机排列
-    population = [random.sample(range(n), n) for _ in range(pop_size)]
-    best_solution, best_count = None, float('inf')
+    saved = checkpoint.get('ga') if checkpoint is not None else None
+    if saved is None:
+        # 初始化种群：随机排列
+        population = np.argsort(rng.random((pop_size, n)), axis=1).astype(np.int32)
+        best_solution, best_count = None, float('inf')
+        first = 0
+        if initial is not None:
+            seeded = max(1, pop_size // 10)
+            population[:seeded] = solution_order(items.tolist(), initial)
+            mutate(population, np.arange(1, seeded), rng)
+            best_solution, best_count = [list(b) for b in initial], len(initial)
+    else:
+        population = saved['population']
+        best_solution, best_count, first = saved['best'], saved['best_count'], saved['gen']
+        rng.bit_generator.state = saved['rng']
     start = time.time()
 
-    for gen in range(generations):
+    for gen in range(first, generations):
+        if best_count <= lower_bound:
+            break
         # 时间终止
         if time.time() - start > time_limit:
             print(f"[GA] 超时 {time_limit}s，停止于代 {gen}")
             break
+        if checkpoint is not None and checkpoint.due():
+            checkpoint.update(ga={'population': population, 'best': best_solution, 'best_count': best_count,
+                                  'gen': gen, 'rng': rng.bit_generator.state})
         # 评估适应度（反转箱数，使得较少箱获得更大权重）
-        decoded = [decode_and_count(ind, items, capacity) for ind in population]
-        counts = [cnt for sol, cnt in decoded]
-        max_cnt = max(counts)
+        with timer('ga.evaluate'):
+            decoded = [decode_and_count(ind, items, capacity, cache) for ind in population]
+        counts = np.array([cnt for sol, cnt in decoded])
         # 分数 = max_cnt - cnt + 1
-        scores = [max_cnt - cnt + 1 for cnt in counts]
+        scores = counts.max() - counts + 1
         # 更新全局最优
-        for sol, cnt in decoded:
-            if cnt < best_count:
-                best_solution, best_count = sol, cnt
-        # 生成新种群
-        new_pop = []
-        while len(new_pop) < pop_size:
-            p1 = roulette_wheel_select(population, scores)
-            if random.random() < crossover_rate:
-                p2 = roulette_wheel_select(population, scores)
-                child = crossover(p1, p2)
-            else:
-                child = p1.copy()
-            if random.random() < mutation_rate:
-                mutate(child)
-            new_pop.append(child)
-        population = new_pop
+        k = int(counts.argmin())
+        if counts[k] < best_count:
+            best_solution, best_count = decoded[k]
+            if best_count <= lower_bound:
+                break
+        # 生成新种群：整代一次性选择、交叉、变异
+        with timer('ga.breed'):
+            parents1 = population[roulette_wheel_select(scores, pop_size, rng)]
+            children = parents1.copy()
+            if n >= 2:
+                cx = np.flatnonzero(rng.random(pop_size) < crossover_rate)
+                if len(cx):
+                    parents2 = population[roulette_wheel_select(scores, len(cx), rng)]
+                    children[cx] = crossover(parents1[cx], parents2, rng)
+            mutate(children, np.flatnonzero(rng.random(pop_size) < mutation_rate), rng)
+        population = children
+        count('ga.generations')
 
+    if checkpoint is not None:
+        checkpoint.discard('ga')
     return best_solution
 
 if __name__ == '__main__':
@@ -109,29 +143,57 @@ if __name__ == '__main__':
     json_file_path = os.path.join(script_dir, 'CW_ins.json')
     output_filename = '20513824_Yuanhao_Dai.json'
 
+    parser = argparse.ArgumentParser(description='Genetic algorithm bin packing solver')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted run from its checkpoint')
+    parser.add_argument('--warm-start', default=None, help='previous solution file to start from')
+    parser.add_argument('--format', default='json', choices=FORMATS, help='solution file format')
+    args = parser.parse_args()
+    warm = WarmStart(args.warm_start) if args.warm_start else None
+    # 每个实例的最优解和搜索状态定期存到检查点目录，--resume 时已完成的实例直接取结果，
+    # 未完成的实例从保存的搜索状态继续
+    ckpt_dir = checkpoint_dir(output_filename)
+    if not args.resume:
+        clear_checkpoints(ckpt_dir)
+    # 续跑时报告的耗时包含之前各段
+    clock = RunClock(ckpt_dir, args.resume, t0)
+
     instances = read_bin_packing_instances(json_file_path)
     total_bins = 0
-    output_json = {'date': datetime.today().strftime('%Y-%m-%d %H:%M:%S'), 'time': 0, 'res': []}
+    with SolutionWriter(output_filename, args.format) as writer:  # 每解完一个实例就写入文件
+        cache = EvalCache()  # 所有实例共用的评估缓存
 
-    for ins in instances:
-        t0_sol = time.time()
-        solution = genetic_fit(
-            ins['items'], ins['capacity'],
-            pop_size=100, generations=1000,
-            crossover_rate=0.8, mutation_rate=0.1,
-            time_limit=60
-        )
-        used = len(solution)
-        total_bins += used
-        output_json['res'].append({'name': ins['name'], 'capacity': ins['capacity'], 'solution': solution})
-        print(f"Instance: {ins['name']}")
-        print(f"Bins Used:\t{used} (Time: {time.time()-t0_sol:.4f}s)")
+        for ins in instances:
+            ckpt = InstanceCheckpoint(ckpt_dir, ins['name'])
+            if ckpt.done():
+                solution, lb = ckpt.get('solution'), ckpt.get('lb')
+            else:
+                ckpt.restore_random()
+                initial = warm.get(ins) if warm is not None else None
+                with track_instance(ins['name']):
+                    lb = lower_bound(ins['items'], ins['capacity'])
+                    solution = genetic_fit(
+                        ins['items'], ins['capacity'],
+                        pop_size=100, generations=1000,
+                        crossover_rate=0.8, mutation_rate=0.1,
+                        time_limit=60, lower_bound=lb, cache=cache, checkpoint=ckpt, initial=initial
+                    )
+                ckpt.finish(solution, lb=lb)
+            used = len(solution)
+            total_bins += used
+            writer.write(ins, solution)
+            print(f"Instance: {ins['name']}")
+            print(f"Bins Used:\t{used} (Time: {ckpt.get('elapsed'):.4f}s)")
+            print(f"Lower Bound:\t{lb} (Proven Optimal: {used <= lb})")
 
-    output_json['time'] = time.time() - t0
-    with open(output_filename, 'w+') as f:
-        json.dump(output_json, f, indent=4)
+        total_time = clock.elapsed()
+        writer.close(total_time)
+    report = write_report(output_filename)
+    clear_checkpoints(ckpt_dir)
 
     print("\n--- Summary ---")
     print(f"Output saved to {output_filename}")
     print(f"Total Used Bins: {total_bins}")
-    print(f"Total Execution Time: {time.time()-t0:.4f}s")
+    print(f"Total Execution Time: {total_time:.4f}s")
+    print(f"Eval Cache:      {cache.summary()}")
+    if report:
+        print(f"Instrumentation report saved to {report}")
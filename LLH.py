@@ -1,145 +1,165 @@
-import json
+import argparse
 import random
 import time
 import os
-from datetime import datetime
+from packing import DOMINATED, best_fit, first_fit, next_fit, local_search
+from instance_io import iter_instances
+from bounds import lower_bound
+from solution_io import SolutionWriter
+from eval_cache import EvalCache
+from instrument import count, timer, track_instance, write_report
+from exact import exact_solve, exact_applicable
+from llh_selection import POLICIES, make_selector
+from bin_state import BinState
+from perturbation import PERTURBATIVE, PERTURBATIVE_NAMES
+from histogram import Histogram, use_histogram, pattern_best_fit, pattern_local_search, bin_count
 
 # 开始计时
 t0 = time.time()
 
+# 小容量实例先做精确求解，单个实例的时限（秒）
+EXACT_TIME_LIMIT = 5
+# 默认的 LLH 选择策略（ε-贪心，ε=LLH_EPSILON）；ucb1 / choice / window（见 llh_selection）需用 --policy 指定
+LLH_POLICY = 'egreedy'
+LLH_EPSILON = 0.15
+# 构造阶段之后在最好解上执行的扰动步数上限与时限（秒）
+PERTURB_MOVES = 200000
+PERTURB_TIME_LIMIT = 2
+# 扰动阶段的 LLH 选择策略：各扰动 LLH 的效果随搜索推进变化很大，用只看近期调用的滑动窗口
+PERTURB_POLICY = 'window'
+
 def read_bin_packing_instances(json_file_path):
-    with open(json_file_path, 'r') as f:
-        return json.load(f)
-
-# Best Fit 算法（解码使用）
-def best_fit(items, capacity):
-    bins = []
-    contents = []
-    for x in items:
-        idx, min_space = -1, capacity + 1
-        for i, used in enumerate(bins):
-            space = capacity - used
-            if space >= x and space < min_space:
-                idx, min_space = i, space
-        if idx >= 0:
-            bins[idx] += x
-            contents[idx].append(x)
-        else:
-            bins.append(x)
-            contents.append([x])
-    return contents
-
-# 局部搜索改进
-from math import inf
-
-def first_improvement(bins, capacity):
-    for i in range(len(bins)):
-        for j in range(len(bins)):
-            if i != j and sum(bins[i]) + sum(bins[j]) <= capacity:
-                merged = bins[i] + bins[j]
-                new_bins = [merged if k==i else bins[k] for k in range(len(bins)) if k!=j]
-                return new_bins
-    return None
-
-def local_search(bins, capacity, max_iters=100):
-    for _ in range(max_iters):
-        nxt = first_improvement(bins, capacity)
-        if not nxt:
-            break
-        bins = nxt
-    return bins
+    return iter_instances(json_file_path)
 
 # PSO 搜索：位置向量 -> 排序解码
 
-# Hyper-Heuristic Search: 选择多种装箱策略（LLH）并用 ε-贪心调度 + 重启
+# Hyper-Heuristic Search: 选择多种装箱策略（LLH），按每 CPU 秒的改进调度（见 llh_selection）+ 重启
 LLH_FUNCS = []
-def next_fit(items, capacity):
-    bins, contents, current = [], [], []
-    for x in items:
-        if sum(current) + x <= capacity:
-            current.append(x)
-        else:
-            bins.append(sum(current)); contents.append(list(current))
-            current = [x]
-    if current:
-        bins.append(sum(current)); contents.append(list(current))
-    return contents
-
-# First Fit 算法
-# 按输入顺序放置，填入第一个能放下的箱子
-
-def first_fit(items, capacity):
-    bins = []
-    contents = []
-    for x in items:
-        placed = False
-        for i in range(len(bins)):
-            if bins[i] + x <= capacity:
-                bins[i] += x
-                contents[i].append(x)
-                placed = True
-                break
-        if not placed:
-            bins.append(x)
-            contents.append([x])
-    return contents
 
-# 准备 LLH 函数列表
+# 准备 LLH 函数列表；inc 为当前最好箱子数时做剪枝解码（之后会做合并局部搜索，见 packing._prune_limits），
+# 不可能更好时返回 DOMINATED
 LLH_FUNCS = [
-    lambda it, C: best_fit(it, C),                           # Best Fit
-    lambda it, C: best_fit(sorted(it, reverse=True), C),     # Best Fit Decreasing
-    lambda it, C: first_fit(it, C),                          # First Fit
-    lambda it, C: next_fit(it, C)                            # Next Fit
+    lambda it, C, inc=None: best_fit(it, C, inc, True),                          # Best Fit
+    lambda it, C, inc=None: best_fit(sorted(it, reverse=True), C, inc, True),    # Best Fit Decreasing
+    lambda it, C, inc=None: first_fit(it, C, inc, True),                         # First Fit
+    lambda it, C, inc=None: next_fit(it, C, inc, True)                           # Next Fit
 ]
 NUM_LLH = len(LLH_FUNCS)
-
-def select_llh(scores, epsilon):
-    # ε-贪心：探索 or 利用
-    if random.random() < epsilon:
-        return random.randrange(NUM_LLH)
-    # 利用：选得分最高
-    max_score = max(scores)
-    # 多重最优打平随机
-    best = [i for i,s in enumerate(scores) if s == max_score]
-    return random.choice(best)
-
-
+LLH_NAMES = ['BF', 'BFD', 'FF', 'NF']
+# Best Fit Decreasing 在 LLH_FUNCS 中的位置：小容量实例上改在直方图表示上运行
+BFD_LLH = 1
+
+# 箱子数达到 lower_bound（已证明最优）或超过 time_limit 秒（None 为不限时）时立即停止
+# cache 为 EvalCache 时，同一 LLH 在相同尺寸序列上的结果（含解）直接复用
+# LLH 的选择由 selector（llh_selection.Selector）负责，未给出时按 policy 新建；
+# 它的记分跨重启保留，调用方传入同一个 selector 时也跨实例保留
+# epsilon 只用于 'egreedy' 策略，和其他策略一起给出时报错，免得调用方以为它生效了
 def hyper_heuristic_search(items, capacity,
-                            epsilon=0.15, max_restarts=100):
+                            epsilon=None, max_restarts=100, lower_bound=0, cache=None, time_limit=None,
+                            policy=LLH_POLICY, selector=None):
+    if selector is None:
+        selector = _make_llh_selector(policy, epsilon)
     best_sol, best_bins = None, float('inf')
-    # 全局 LLH 累积得分（可选用于统计）
-    global_scores = [0.0]*NUM_LLH
+    start = time.time()
+    # 尺寸种类少的实例：BFD 与合并局部搜索按 (模式, 箱子数) 分组处理，最后才展开
+    hist = Histogram(items) if use_histogram(items) else None
+    best_is_groups = False
     for r in range(max_restarts):
-        # 重启时本地得分重置
-        scores = [0.0]*NUM_LLH
+        if best_bins <= lower_bound:
+            break
+        if time_limit is not None and best_sol is not None and time.time() - start > time_limit:
+            break
         # 当前最好解为全局最好
         current_best_bins = best_bins
         # 按顺序应用策略直到无改进
         while True:
-            idx = select_llh(scores, epsilon)
+            idx = selector.select()
             # 随机打乱输入顺序，增加多样
             perm = items[:]
             random.shuffle(perm)
-            # 调用选中 LLH
-            sol = LLH_FUNCS[idx](perm, capacity)
-            sol = local_search(sol, capacity)
-            cnt = len(sol)
-            # 如果得到改进
-            if cnt < current_best_bins:
+            # 本次调用的 CPU 时间（解码 + 合并局部搜索，缓存命中时几乎为 0）
+            cpu = time.process_time()
+            # 调用选中 LLH（BFD 与输入顺序无关，用排序后的序列作键）
+            is_groups = idx == BFD_LLH and hist is not None
+            entry = None
+            if cache is not None:
+                key = cache.key(sorted(perm, reverse=True) if idx == BFD_LLH else perm, capacity, ('llh', idx))
+                entry = cache.get(key)
+            if entry is not None:
+                cnt, sol = entry
+            elif is_groups:
+                sol = pattern_best_fit(hist.decreasing(), hist.sizes, capacity)
+                sol = pattern_local_search(sol, hist.sizes, capacity)
+                cnt = bin_count(sol)
+            else:
+                # BFD 的结果与输入顺序无关，完整算一次写进缓存比每次剪枝更划算
+                prune = idx != BFD_LLH and current_best_bins != float('inf')
+                sol = LLH_FUNCS[idx](perm, capacity, current_best_bins if prune else None)
+                if sol is DOMINATED:
+                    cnt = DOMINATED
+                else:
+                    sol = local_search(sol, capacity)
+                    cnt = len(sol)
+            # 被剪枝的结果只相对当前最好解成立，不写入缓存
+            if cache is not None and entry is None and cnt is not DOMINATED:
+                cache.put(key, cnt, sol)
+            cpu = time.process_time() - cpu
+            # 如果得到改进（被剪枝的必然没有改进）
+            if cnt is not DOMINATED and cnt < current_best_bins:
+                # 改进箱数记给该 LLH；还没有任何解时的第一次调用不算改进
+                gain = current_best_bins - cnt if current_best_bins != float('inf') else 0
+                selector.update(idx, gain, cpu)
                 current_best_bins = cnt
                 best_local = sol
-                # 提升该 LLH 得分
-                scores[idx] += float(best_bins - cnt)
-                global_scores[idx] += float(best_bins - cnt)
+                best_local_is_groups = is_groups
+                if cnt <= lower_bound:
+                    break
             else:
+                selector.update(idx, 0, cpu)
                 break
         # 重启后比较全局
         if current_best_bins < best_bins:
             best_bins = current_best_bins
             best_sol = best_local
+            best_is_groups = best_local_is_groups
+    if best_is_groups:
+        return hist.expand(best_sol)
     return best_sol
 
 
+def _make_llh_selector(policy, epsilon=None):
+    if policy != 'egreedy':
+        if epsilon is not None:
+            raise ValueError(f"epsilon is only used by the 'egreedy' policy, not '{policy}'")
+        return make_selector(policy, LLH_NAMES)
+    return make_selector(policy, LLH_NAMES, epsilon=LLH_EPSILON if epsilon is None else epsilon)
+
+
+# 扰动阶段：在已有解上原地执行扰动型 LLH（见 perturbation），每一步由 selector 选择，
+# 记给 LLH 的改进量 = 减少的箱子数 + Σ(load/C)² 的增量，连同本步 CPU 时间交给 selector
+# 箱子数达到 lower_bound、超过 time_limit 秒（None 为不限时）或走满 max_moves 步时停止
+def perturbative_search(bins, capacity, max_moves=PERTURB_MOVES, lower_bound=0, time_limit=None,
+                        policy=PERTURB_POLICY, selector=None):
+    if selector is None:
+        selector = make_selector(policy, PERTURBATIVE_NAMES)
+    state = BinState(bins, capacity)
+    scale = float(capacity) ** 2
+    clock = time.process_time
+    start = time.time()
+    moves = 0
+    while moves < max_moves and state.count() > lower_bound:
+        # 每 1024 步检查一次时间
+        if not moves & 1023 and time_limit is not None and time.time() - start > time_limit:
+            break
+        moves += 1
+        idx = selector.select()
+        t = clock()
+        delta, gain = PERTURBATIVE[idx](state)
+        selector.update(idx, gain / scale - delta, clock() - t)
+    count('llh.moves', moves)
+    return state.to_bins()
+
+
 # --- Main入口 ---
 if __name__ == '__main__':
     random.seed(0)
@@ -147,38 +167,63 @@ if __name__ == '__main__':
     json_file_path = os.path.join(script_dir, 'CW_ins.json')
     output_filename = '20513824_Yuanhao_Dai.json'
 
+    parser = argparse.ArgumentParser(description='Hyper-heuristic bin packing solver')
+    parser.add_argument('--policy', default=LLH_POLICY, choices=POLICIES, help='LLH selection policy')
+    args = parser.parse_args()
+
     instances = read_bin_packing_instances(json_file_path)
     total_bins = 0
-    output_json = {
-        'date': datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
-        'time': 0,
-        'res': []
-    }
-
-    for ins in instances:
-        start_time_sol = time.time()
-        solution = hyper_heuristic_search(
-            ins['items'], ins['capacity'],
-            epsilon=0.15, max_restarts=100
-        )
-        bin_used = len(solution)
-        total_bins += bin_used
-
-        output_json['res'].append({
-            'name': ins['name'],
-            'capacity': ins['capacity'],
-            'solution': solution
-        })
-
-        print(f"Instance: {ins['name']}")
-        print(f"Bins Used:	{bin_used} (Time: {time.time() - start_time_sol:.4f}s)")
-
-    total_time = time.time() - t0
-    output_json['time'] = total_time
-    with open(output_filename, 'w+') as f:
-        json.dump(output_json, f, indent=4)
+    with SolutionWriter(output_filename) as writer:  # 每解完一个实例就写入文件
+        cache = EvalCache()  # 所有实例共用的评估缓存
+        selector = _make_llh_selector(args.policy)  # 所有实例共用的 LLH 记分
+        perturb_selector = make_selector(PERTURB_POLICY, PERTURBATIVE_NAMES)
+
+        for ins in instances:
+            start_time_sol = time.time()
+            with track_instance(ins['name']):
+                lb = lower_bound(ins['items'], ins['capacity'])
+                # 精确求解已证明最优的实例直接跳过超启发式搜索
+                solution, proven = None, False
+                if exact_applicable(ins['capacity']):
+                    with timer('phase.exact'):
+                        solution, proven = exact_solve(ins['items'], ins['capacity'], EXACT_TIME_LIMIT, lb)
+                if not proven:
+                    with timer('phase.hyper_heuristic'):
+                        hh_solution = hyper_heuristic_search(
+                            ins['items'], ins['capacity'],
+                            max_restarts=100, lower_bound=lb, cache=cache, selector=selector
+                        )
+                    if len(hh_solution) > lb:
+                        with timer('phase.perturbative'):
+                            hh_solution = perturbative_search(
+                                hh_solution, ins['capacity'], lower_bound=lb,
+                                time_limit=PERTURB_TIME_LIMIT, selector=perturb_selector
+                            )
+                    if solution is None or len(hh_solution) < len(solution):
+                        solution = hh_solution
+            bin_used = len(solution)
+            total_bins += bin_used
+
+            writer.write(ins, solution)
+
+            print(f"Instance: {ins['name']}")
+            print(f"Bins Used:	{bin_used} (Time: {time.time() - start_time_sol:.4f}s)")
+            print(f"Lower Bound:	{lb} (Proven Optimal: {proven or bin_used <= lb})")
+
+        total_time = time.time() - t0
+        writer.close(total_time)
+    report = write_report(output_filename)
 
     print("\n--- Summary ---")
     print(f"Output saved to {output_filename}")
     print(f"Total Used Bins: {total_bins}")
     print(f"Total Execution Time: {total_time:.4f}s")
+    print(f"Eval Cache:      {cache.summary()}")
+    print(f"LLH Selection ({args.policy}):")
+    for line in selector.summary_lines():
+        print(f"  {line}")
+    print(f"Perturbative LLH ({PERTURB_POLICY}):")
+    for line in perturb_selector.summary_lines():
+        print(f"  {line}")
+    if report:
+        print(f"Instrumentation report saved to {report}")
@@ -1,116 +1,115 @@
-import json
+import argparse
 import random
 import time
 import os
-from datetime import datetime
+import numpy as np
+from packing import best_fit, local_search
+from instance_io import iter_instances
+from bounds import lower_bound
+from solution_io import FORMATS, SolutionWriter, WarmStart, solution_order
+from eval_cache import EvalCache
+from instrument import count, timer, track_instance, write_report
+from checkpoint import InstanceCheckpoint, RunClock, checkpoint_dir, clear_checkpoints
 
 # 开始计时
 t0 = time.time()
 
 def read_bin_packing_instances(json_file_path):
-    with open(json_file_path, 'r') as f:
-        return json.load(f)
+    return iter_instances(json_file_path)
 
-# Best Fit 算法（解码使用）
-def best_fit(items, capacity):
-    bins = []
-    contents = []
-    for x in items:
-        idx, min_space = -1, capacity + 1
-        for i, used in enumerate(bins):
-            space = capacity - used
-            if space >= x and space < min_space:
-                idx, min_space = i, space
-        if idx >= 0:
-            bins[idx] += x
-            contents[idx].append(x)
-        else:
-            bins.append(x)
-            contents.append([x])
-    return contents
+# 随机键解码：每行按位置值从大到小排序（稳定），一次 argsort 得到所有粒子的物品顺序
+def decode_orders(pos):
+    return np.argsort(-pos, axis=1, kind='stable')
 
-# 局部搜索改进
-from math import inf
+# 按顺序 Best Fit + 局部搜索
+def evaluate(order, items, capacity):
+    return local_search(best_fit(items[order].tolist(), capacity), capacity)
 
-def first_improvement(bins, capacity):
-    for i in range(len(bins)):
-        for j in range(len(bins)):
-            if i != j and sum(bins[i]) + sum(bins[j]) <= capacity:
-                merged = bins[i] + bins[j]
-                new_bins = [merged if k==i else bins[k] for k in range(len(bins)) if k!=j]
-                return new_bins
-    return None
-
-def local_search(bins, capacity, max_iters=100):
-    for _ in range(max_iters):
-        nxt = first_improvement(bins, capacity)
-        if not nxt:
-            break
-        bins = nxt
-    return bins
+# 评估所有粒子的箱子数；cache 为 EvalCache 时，解码出相同尺寸序列的粒子只算一次
+def count_all(orders, items, capacity, cache=None):
+    if cache is None:
+        return np.array([len(evaluate(o, items, capacity)) for o in orders])
+    seqs = [items[o] for o in orders]
+    return np.array(cache.lookup_counts(
+        seqs, capacity, 'pso',
+        lambda todo: [len(local_search(best_fit(s.tolist(), capacity), capacity)) for s in todo]))
 
 # PSO 搜索：位置向量 -> 排序解码
-
+# 整个粒子群存为 (num_particles, n) 数组，速度、限幅、位置更新一次向量化完成（同步更新 gbest）
+# gbest 的箱子数达到 lower_bound（已证明最优）时立即停止
+# checkpoint 为 InstanceCheckpoint 时定期把整个粒子群、迭代数和随机数发生器状态存到 'pso' 字段，续跑时从中恢复
+# initial 为已有的解（热启动）时，第一个粒子的位置设为解码后恰好是“按箱子依次排列”的随机键，
+# 最终结果不会比 initial 差
 def pso_search(items, capacity,
                num_particles=50, iterations=200,
                w=1.0, c1=1.5, c2=1.5,
-               vmax=1.0, time_limit=30):
+               vmax=1.0, time_limit=30, seed=None, lower_bound=0, cache=None, checkpoint=None, initial=None):
+    if initial is not None and len(initial) <= lower_bound:
+        return [list(b) for b in initial]
+    rng = np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+    items = np.asarray(items, dtype=np.int32)
     n = len(items)
-    # 初始化粒子
-    swarm = []
-    for _ in range(num_particles):
-        pos = [random.uniform(-1,1) for _ in range(n)]
-        vel = [0.0]*n
-        # 解码：按 pos 排序得到顺序
-        order = sorted(range(n), key=lambda i: pos[i], reverse=True)
-        perm = [items[i] for i in order]
-        sol = local_search(best_fit(perm, capacity), capacity)
-        cnt = len(sol)
-        swarm.append({
-            'pos': pos,
-            'vel': vel,
-            'pbest_pos': pos[:],
-            'pbest_count': cnt
-        })
-    # 全局最优
-    gbest_pos = min(swarm, key=lambda p: p['pbest_count'])['pbest_pos'][:]
-    gbest_count = min(p['pbest_count'] for p in swarm)
+    saved = checkpoint.get('pso') if checkpoint is not None else None
+    if saved is None:
+        # 初始化粒子
+        pos = rng.uniform(-1, 1, size=(num_particles, n))
+        if initial is not None:
+            pos[0, solution_order(items.tolist(), initial)] = np.linspace(1, -1, n)
+        vel = np.zeros((num_particles, n))
+        orders = decode_orders(pos)
+        pbest_pos = pos.copy()
+        pbest_count = count_all(orders, items, capacity, cache)
+        # 全局最优
+        g = int(pbest_count.argmin())
+        gbest_pos = pbest_pos[g].copy()
+        gbest_count = int(pbest_count[g])
+        first = 0
+    else:
+        pos, vel, pbest_pos, pbest_count = saved['pos'], saved['vel'], saved['pbest_pos'], saved['pbest_count']
+        gbest_pos, gbest_count, first = saved['gbest_pos'], saved['gbest_count'], saved['it']
+        rng.bit_generator.state = saved['rng']
     start = time.time()
     # 迭代
-    for it in range(iterations):
+    for it in range(first, iterations):
+        if gbest_count <= lower_bound:
+            break
         if time.time() - start > time_limit:
             print(f"[PSO] 超时 {time_limit}s，停止于迭代 {it}")
             break
-        for p in swarm:
-            # 更新速度与位置
-            for i in range(n):
-                r1, r2 = random.random(), random.random()
-                p['vel'][i] = (w*p['vel'][i]
-                               + c1*r1*(p['pbest_pos'][i]-p['pos'][i])
-                               + c2*r2*(gbest_pos[i]-p['pos'][i]))
-                # 限幅
-                if p['vel'][i] > vmax: p['vel'][i] = vmax
-                if p['vel'][i] < -vmax: p['vel'][i] = -vmax
-                p['pos'][i] += p['vel'][i]
-            # 解码并评估
-            order = sorted(range(n), key=lambda i: p['pos'][i], reverse=True)
-            perm = [items[i] for i in order]
-            sol = local_search(best_fit(perm, capacity), capacity)
-            cnt = len(sol)
-            # 更新 pbest
-            if cnt < p['pbest_count']:
-                p['pbest_count'] = cnt
-                p['pbest_pos'] = p['pos'][:]
-                # 更新 gbest
-                if cnt < gbest_count:
-                    gbest_count = cnt
-                    gbest_pos = p['pos'][:]
+        if checkpoint is not None and checkpoint.due():
+            checkpoint.update(pso={'pos': pos, 'vel': vel, 'pbest_pos': pbest_pos, 'pbest_count': pbest_count,
+                                   'gbest_pos': gbest_pos, 'gbest_count': gbest_count, 'it': it,
+                                   'rng': rng.bit_generator.state})
+        # 更新速度与位置
+        r1 = rng.random((num_particles, n))
+        r2 = rng.random((num_particles, n))
+        vel = w * vel + c1 * r1 * (pbest_pos - pos) + c2 * r2 * (gbest_pos - pos)
+        # 限幅
+        np.clip(vel, -vmax, vmax, out=vel)
+        pos += vel
+        # 解码并评估
+        with timer('pso.evaluate'):
+            orders = decode_orders(pos)
+            counts = count_all(orders, items, capacity, cache)
+        # 更新 pbest
+        better = counts < pbest_count
+        pbest_count[better] = counts[better]
+        pbest_pos[better] = pos[better]
+        # 更新 gbest
+        g = int(counts.argmin())
+        if counts[g] < gbest_count:
+            gbest_count = int(counts[g])
+            gbest_pos = pos[g].copy()
+        count('pso.iterations')
         if it%50==0 or it==iterations-1:
             print(f"Iter {it}, Best bins={gbest_count}")
+    if checkpoint is not None:
+        checkpoint.discard('pso')
     # 最后解码全局最优
-    order = sorted(range(n), key=lambda i: gbest_pos[i], reverse=True)
-    perm = [items[i] for i in order]
-    return local_search(best_fit(perm, capacity), capacity)
+    best = evaluate(decode_orders(gbest_pos[None, :])[0], items, capacity)
+    if initial is not None and len(initial) < len(best):
+        return [list(b) for b in initial]
+    return best
 
 if __name__=='__main__':
     random.seed(0)
@@ -118,29 +117,57 @@ if __name__=='__main__':
     json_file_path = os.path.join(script_dir, 'CW_ins.json')
     output_filename = '20513824_Yuanhao_Dai.json'
 
+    parser = argparse.ArgumentParser(description='Particle swarm bin packing solver')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted run from its checkpoint')
+    parser.add_argument('--warm-start', default=None, help='previous solution file to start from')
+    parser.add_argument('--format', default='json', choices=FORMATS, help='solution file format')
+    args = parser.parse_args()
+    warm = WarmStart(args.warm_start) if args.warm_start else None
+    # 每个实例的最优解和搜索状态定期存到检查点目录，--resume 时已完成的实例直接取结果，
+    # 未完成的实例从保存的搜索状态继续
+    ckpt_dir = checkpoint_dir(output_filename)
+    if not args.resume:
+        clear_checkpoints(ckpt_dir)
+    # 续跑时报告的耗时包含之前各段
+    clock = RunClock(ckpt_dir, args.resume, t0)
+
     instances = read_bin_packing_instances(json_file_path)
     total_bins = 0
-    output_json = {'date': datetime.today().strftime('%Y-%m-%d %H:%M:%S'), 'time':0, 'res':[]}
+    with SolutionWriter(output_filename, args.format) as writer:  # 每解完一个实例就写入文件
+        cache = EvalCache()  # 所有实例共用的评估缓存
 
-    for ins in instances:
-        t0sol = time.time()
-        solution = pso_search(
-            ins['items'], ins['capacity'],
-            num_particles=50, iterations=500,
-            w=1.0, c1=1.5, c2=1.5,
-            vmax=1.0, time_limit=30
-        )
-        used = len(solution)
-        total_bins += used
-        output_json['res'].append({'name':ins['name'],'capacity':ins['capacity'],'solution':solution})
-        print(f"Instance: {ins['name']}")
-        print(f"Bins Used:\t{used} (Time: {time.time()-t0sol:.4f}s)")
+        for ins in instances:
+            ckpt = InstanceCheckpoint(ckpt_dir, ins['name'])
+            if ckpt.done():
+                solution, lb = ckpt.get('solution'), ckpt.get('lb')
+            else:
+                ckpt.restore_random()
+                initial = warm.get(ins) if warm is not None else None
+                with track_instance(ins['name']):
+                    lb = lower_bound(ins['items'], ins['capacity'])
+                    solution = pso_search(
+                        ins['items'], ins['capacity'],
+                        num_particles=50, iterations=500,
+                        w=1.0, c1=1.5, c2=1.5,
+                        vmax=1.0, time_limit=30, lower_bound=lb, cache=cache, checkpoint=ckpt, initial=initial
+                    )
+                ckpt.finish(solution, lb=lb)
+            used = len(solution)
+            total_bins += used
+            writer.write(ins, solution)
+            print(f"Instance: {ins['name']}")
+            print(f"Bins Used:\t{used} (Time: {ckpt.get('elapsed'):.4f}s)")
+            print(f"Lower Bound:\t{lb} (Proven Optimal: {used <= lb})")
 
-    output_json['time']=time.time()-t0
-    with open(output_filename,'w+') as f:
-        json.dump(output_json,f,indent=4)
+        total_time = clock.elapsed()
+        writer.close(total_time)
+    report = write_report(output_filename)
+    clear_checkpoints(ckpt_dir)
 
     print("\n--- Summary ---")
     print(f"Output saved to {output_filename}")
     print(f"Total Used Bins: {total_bins}")
-    print(f"Total Execution Time: {time.time()-t0:.4f}s")
+    print(f"Total Execution Time: {total_time:.4f}s")
+    print(f"Eval Cache:      {cache.summary()}")
+    if report:
+        print(f"Instrumentation report saved to {report}")
@@ -1,153 +1,34 @@
-import json
+import argparse
 import random
 import time
 import os
-import math
 import copy
-from datetime import datetime
+from packing import best_fit, local_search
+from instance_io import iter_instances
+from random_search import random_search_fit
+from annealing import simulated_annealing
+from tabu import tabu_search
+from parallel_runner import iter_results, run_instances
+from bounds import lower_bound
+from scheduler import STAGES, StageHistory, StagePlan, allocate, size_class
+from solution_io import FORMATS, SolutionWriter, WarmStart
+from eval_cache import EvalCache
+from exact import exact_solve, exact_applicable
+from instrument import add_time, timer, write_report
+from checkpoint import InstanceCheckpoint, RunClock, checkpoint_dir, clear_checkpoints
 
 # 开始计时
 start_time = time.time()
 
-def read_bin_packing_instances(json_file_path):
-    with open(json_file_path, 'r') as file:
-        return json.load(file)
-
-# Best Fit 算法：直接按照输入顺序放置，不做排序
-def best_fit(items, capacity):
-    bins = []
-    bins_contents = []
-    for item in items:
-        best_bin = -1
-        min_space_left = capacity + 1
-        for i in range(len(bins)):
-            space_left = capacity - bins[i]
-            if space_left >= item and space_left < min_space_left:
-                best_bin = i
-                min_space_left = space_left
-        if best_bin != -1:
-            bins[best_bin] += item
-            bins_contents[best_bin].append(item)
-        else:
-            bins.append(item)
-            bins_contents.append([item])
-    return bins_contents
-
-# First‐Improvement 局部合并
-def first_improvement(bins, capacity):
-    for i in range(len(bins)):
-        for j in range(len(bins)):
-            if i == j:
-                continue
-            if sum(bins[i]) + sum(bins[j]) <= capacity:
-                new_bins = []
-                for k in range(len(bins)):
-                    if k == i:
-                        new_bins.append(bins[i] + bins[j])
-                    elif k != j:
-                        new_bins.append(bins[k])
-                return new_bins
-    return None
+# 整个运行的总时间预算（秒），留出余量保证不超过 CW_marker.py 的 300s 限制
+TIME_BUDGET = 270
+# 各阶段在相似实例上的历史改进记录（放在脚本所在目录，与从哪里启动无关）
+STAGE_HISTORY_FILE = 'stage_history.json'
+# 小容量实例先做精确求解，单个实例的时限（秒）
+EXACT_TIME_LIMIT = 5
 
-# 局部搜索
-def local_search(bins, capacity, max_iters=100):
-    for _ in range(max_iters):
-        improved = first_improvement(bins, capacity)
-        if improved is None:
-            break
-        bins = improved
-    return bins
-
-# 模拟退火二次改进
-def simulated_annealing(bins, capacity, init_temp=100.0, alpha=0.95, min_temp=1e-3, max_iters=1000):
-    current = [list(b) for b in bins]
-    best = [list(b) for b in bins]
-    curr_count = len(current)
-    best_count = curr_count
-    temp = init_temp
-    iters = 0
-    while temp > min_temp and iters < max_iters:
-        neighbor = copy.deepcopy(current)
-        i = random.randrange(len(neighbor))
-        if not neighbor[i]:
-            iters += 1
-            temp *= alpha
-            continue
-        item = random.choice(neighbor[i])
-        j_choices = [idx for idx in range(len(neighbor)) if idx != i]
-        if not j_choices:
-            iters += 1
-            temp *= alpha
-            continue
-        j = random.choice(j_choices)
-        if sum(neighbor[j]) + item <= capacity:
-            neighbor[i].remove(item)
-            neighbor[j].append(item)
-            neighbor = [b for b in neighbor if b]
-        else:
-            if neighbor[j]:
-                j_item = random.choice(neighbor[j])
-                if sum(neighbor[i]) - item + j_item <= capacity and sum(neighbor[j]) - j_item + item <= capacity:
-                    neighbor[i].remove(item)
-                    neighbor[i].append(j_item)
-                    neighbor[j].remove(j_item)
-                    neighbor[j].append(item)
-        neigh_count = len(neighbor)
-        delta = neigh_count - curr_count
-        if delta <= 0 or random.random() < math.exp(-delta / temp):
-            current = neighbor
-            curr_count = neigh_count
-            if curr_count < best_count:
-                best = [list(b) for b in current]
-                best_count = curr_count
-        temp *= alpha
-        iters += 1
-    return best
-
-# 禁忌搜索改进
-def tabu_search(bins, capacity, tabu_size=50, max_iters=500, time_limit=30):
-    current = [list(b) for b in bins]
-    best = [list(b) for b in current]
-    best_count = len(best)
-    tabu_list = []
-    start = time.time()
-    for _ in range(max_iters):
-        if time.time() - start > time_limit:
-            break
-        best_neighbor = None
-        best_neighbor_count = float('inf')
-        best_move = None
-        # 遍历所有单件移动
-        for i, b in enumerate(current):
-            for item in b:
-                for j in range(len(current)):
-                    if j == i: continue
-                    if sum(current[j]) + item <= capacity:
-                        neighbor = copy.deepcopy(current)
-                        neighbor[i].remove(item)
-                        neighbor[j].append(item)
-                        neighbor = [bin for bin in neighbor if bin]
-                        move = (i, j, item)
-                        reverse_move = (j, i, item)
-                        if move in tabu_list:
-                            continue
-                        neigh_count = len(neighbor)
-                        if neigh_count < best_neighbor_count:
-                            best_neighbor = neighbor
-                            best_neighbor_count = neigh_count
-                            best_move = reverse_move
-        if best_neighbor is None:
-            break
-        current = best_neighbor
-        # 更新禁忌表
-        tabu_list.append(best_move)
-        if len(tabu_list) > tabu_size:
-            tabu_list.pop(0)
-        # 更新全局最优
-        if best_neighbor_count < best_count:
-            best = copy.deepcopy(best_neighbor)
-            best_count = best_neighbor_count
-    return best
+def read_bin_packing_instances(json_file_path):
+    return iter_instances(json_file_path)
 
 # 生成邻居（用于VNS）
 def generate_neighbor(bins, capacity):
@@ -168,13 +49,13 @@ def generate_neighbor(bins, capacity):
     return None
 
 # 变量邻域搜索改进
-def variable_neighborhood_search(bins, capacity, max_neighborhood=3, max_iters=100, time_limit=30):
+def variable_neighborhood_search(bins, capacity, max_neighborhood=3, max_iters=100, time_limit=30, lower_bound=0):
     current = [list(b) for b in bins]
     best = [list(b) for b in current]
     best_count = len(best)
     start = time.time()
     for _ in range(max_iters):
-        if time.time() - start > time_limit:
+        if time.time() - start > time_limit or best_count <= lower_bound:
             break
         improved = False
         for k in range(1, max_neighborhood + 1):
@@ -198,88 +79,251 @@ def variable_neighborhood_search(bins, capacity, max_neighborhood=3, max_iters=1
             break
     return best
 
-# 随机搜索 + 局部改进 + 时限控制（不含退火）
-def random_search_fit(items, capacity, fit_fun, iterations=1000, time_limit=60):
-    best_solution = None
-    min_bins = float('inf')
-    start_search = time.time()
-    for _ in range(iterations):
-        if time.time() - start_search > time_limit:
-            print(f"[Warning] 搜索超过 {time_limit}s，提前退出随机搜索。")
-            break
-        tmp_items = items[:]
-        random.shuffle(tmp_items)
-        sol = fit_fun(tmp_items, capacity)
-        sol = local_search(sol, capacity)
-        if len(sol) < min_bins:
-            min_bins = len(sol)
-            best_solution = sol
-    return best_solution
+# 单个实例的完整流程：随机搜索 -> 退火 -> 禁忌 -> VNS，取最优
+# 每一步都带上实例下界，达到下界即已最优，后续步骤直接返回
+# slice_seconds 为 None 时各步使用固定时限；否则由 StagePlan 在各步之间分配这段时间，
+# 没用完的时间顺延给后面的步骤，skip 中的步骤直接沿用上一步的解
+# ckpt_dir 不为 None 时每步完成后把该步的解存进实例检查点，退火与禁忌搜索还会定期保存搜索状态；
+# 续跑时已完成的步骤直接取保存的解，正在进行的步骤从保存的状态继续
+# initial 为已有的解（热启动）时不再做随机搜索，第一步直接对它做合并局部搜索，省下的时间顺延给后面的改进步骤
+# spent 为本次运行在主进程里已经花在该实例上的 (墙钟, CPU) 时间，随检查点一起累计
+# 返回 (最终解, 各步箱子数, 各步耗时)
+def solve_instance(ins, slice_seconds=None, deadline=None, skip=(), lb=None, ckpt_dir=None, initial=None,
+                   spent=(0.0, 0.0)):
+    times = {}
+    t = time.time()
+    if lb is None:
+        lb = lower_bound(ins['items'], ins['capacity'])
+    times['Bound'] = time.time() - t
+    plan = None if slice_seconds is None else StagePlan(slice_seconds, deadline, skip)
+    ckpt = None
+    stages = {}
+    if ckpt_dir is not None:
+        ckpt = InstanceCheckpoint(ckpt_dir, ins['name'])
+        ckpt.charge(*spent)
+        ckpt.restore_random()
+        stages = dict(ckpt.get('stages', {}))
+    resumed = sorted(stages)
 
-if __name__ == "__main__":
-    random.seed(0)
+    def limit(stage, default):
+        return default if plan is None else plan.budget(stage)
+
+    def finish(stage, t_stage, solution):
+        times[stage] = time.time() - t_stage
+        add_time('phase.' + stage, times[stage])
+        if plan is not None:
+            plan.spent(times[stage])
+        if ckpt is not None and stage not in stages:
+            stages[stage] = solution
+            ckpt.update(stages=stages)
+        return solution
+
+    # 第一步：随机搜索 + 局部搜索（实例在子进程中求解，缓存按实例建立，计数随结果返回）
+    t_stage = time.time()
+    cache = EvalCache()
+    if 'Base' in stages:
+        base_solution = stages['Base']
+    elif initial is not None:
+        base_solution = local_search([list(b) for b in initial], ins['capacity'])
+    else:
+        base_solution = random_search_fit(
+            ins['items'], ins['capacity'], best_fit, iterations=1000, time_limit=limit('Base', 60),
+            improve=True, lower_bound=lb, cache=cache
+        )
+    base_count = len(finish('Base', t_stage, base_solution))
+
+    # 第二步：退火二次改进
+    t_stage = time.time()
+    if 'Annealed' in stages:
+        annealed_solution = stages['Annealed']
+    elif 'Annealed' in skip:
+        annealed_solution = base_solution
+    else:
+        annealed_solution = simulated_annealing(
+            base_solution, ins['capacity'], alpha=0.9999, max_iters=100000,
+            time_limit=limit('Annealed', 30), lower_bound=lb, checkpoint=ckpt
+        )
+    annealed_count = len(finish('Annealed', t_stage, annealed_solution))
+
+    # 第三步：禁忌搜索改进
+    t_stage = time.time()
+    if 'Tabu' in stages:
+        tabu_solution = stages['Tabu']
+    elif 'Tabu' in skip:
+        tabu_solution = annealed_solution
+    else:
+        tabu_solution = tabu_search(annealed_solution, ins['capacity'], tabu_size=50, max_iters=500,
+                                    time_limit=limit('Tabu', 60), lower_bound=lb, checkpoint=ckpt)
+    tabu_count = len(finish('Tabu', t_stage, tabu_solution))
+
+    # 第四步：VNS改进
+    t_stage = time.time()
+    if 'VNS' in stages:
+        vns_solution = stages['VNS']
+    elif 'VNS' in skip:
+        vns_solution = tabu_solution
+    else:
+        vns_solution = variable_neighborhood_search(tabu_solution, ins['capacity'], max_neighborhood=3,
+                                                    max_iters=100, time_limit=limit('VNS', 60), lower_bound=lb)
+    vns_count = len(finish('VNS', t_stage, vns_solution))
+
+    # 选择最优
+    final_sol = base_solution
+    final_count = base_count
+    if annealed_count < final_count:
+        final_sol, final_count = annealed_solution, annealed_count
+    if tabu_count < final_count:
+        final_sol, final_count = tabu_solution, tabu_count
+    if vns_count < final_count:
+        final_sol, final_count = vns_solution, vns_count
+
+    counts = {
+        'Base': base_count,
+        'Annealed': annealed_count,
+        'Tabu': tabu_count,
+        'VNS': vns_count,
+        'LB': lb,
+        'Cache': cache.stats(),
+        'Resumed': resumed
+    }
+    return final_sol, counts, times
+
+# 精确求解阶段：只处理小容量实例，返回 (解, 是否已证明最优)，不适用时返回 (None, False)
+# initial（热启动的解）作为分支定界的初始上界
+def exact_instance(ins, time_limit, lb, initial=None):
+    if not exact_applicable(ins['capacity']):
+        return None, False
+    with timer('phase.Exact'):
+        return exact_solve(ins['items'], ins['capacity'], time_limit, lb, initial)
 
+if __name__ == "__main__":
     script_dir      = os.path.dirname(os.path.abspath(__file__))
     json_file_path  = os.path.join(script_dir, 'CW_ins.json')
     output_filename = '20513824_Yuanhao_Dai.json'
 
-    instances = read_bin_packing_instances(json_file_path)
+    parser = argparse.ArgumentParser(description='Multi-stage bin packing solver')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted run from its checkpoint')
+    parser.add_argument('--warm-start', default=None, help='previous solution file to start from')
+    parser.add_argument('--format', default='json', choices=FORMATS, help='solution file format')
+    args = parser.parse_args()
+    # 每个实例的各步结果和搜索状态存到检查点目录；--resume 时已完成的实例直接取结果，
+    # 其余实例重新分配剩余预算，从保存的步骤和搜索状态继续
+    ckpt_dir = checkpoint_dir(output_filename)
+    if not args.resume:
+        clear_checkpoints(ckpt_dir)
+    # 续跑时之前各段用掉的时间从总预算里扣除，报告的耗时也包含它们
+    clock = RunClock(ckpt_dir, args.resume, start_time)
+    start_time -= clock.prior
+
+    # 需要先看到全部实例才能分配时间预算，这里把流式读取的结果收集成列表
+    instances = list(read_bin_packing_instances(json_file_path))
+    warm = WarmStart(args.warm_start) if args.warm_start else None
+    initials = [warm.get(ins) if warm is not None else None for ins in instances]
+    ckpts = [InstanceCheckpoint(ckpt_dir, ins['name']) for ins in instances]
+    todo = [k for k, c in enumerate(ckpts) if not c.done()]
 
     total_bins = 0
-    output_json = {
-        'date': datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
-        'time': 0,
-        'res': []
-    }
+    # 按总预算给各实例分配时间片，并根据历史记录跳过从未带来改进的阶段
+    workers = os.cpu_count() or 1
+    history = StageHistory(os.path.join(script_dir, STAGE_HISTORY_FILE))
+    lbs = [lower_bound(ins['items'], ins['capacity']) for ins in instances]
 
-    for ins in instances:
-        start_time_sol = time.time()
+    # 精确求解：已证明最优的实例不再进入启发式流程，时间预算全部留给其余实例
+    exact = dict(zip(todo, run_instances(exact_instance, [instances[k] for k in todo], seeds=todo,
+                                         workers=workers, task_args=[(EXACT_TIME_LIMIT, lbs[k], initials[k]) for k in todo])))
+    pending = [k for k in todo if not exact[k][0][1]]
 
-        # 第一步：随机搜索 + 局部搜索
-        base_solution = random_search_fit(
-            ins['items'], ins['capacity'], best_fit, iterations=1000, time_limit=60
-        )
-        base_count = len(base_solution)
-
-        # 第二步：退火二次改进
-        annealed_solution = simulated_annealing(base_solution, ins['capacity'])
-        annealed_count = len(annealed_solution)
-
-        # 第三步：禁忌搜索改进
-        tabu_solution = tabu_search(annealed_solution, ins['capacity'], tabu_size=50, max_iters=500, time_limit=60)
-        tabu_count = len(tabu_solution)
-
-        # 第四步：VNS改进
-        vns_solution = variable_neighborhood_search(tabu_solution, ins['capacity'], max_neighborhood=3, max_iters=100, time_limit=60)
-        vns_count = len(vns_solution)
-
-        # 选择最优
-        final_sol = base_solution
-        final_count = base_count
-        if annealed_count < final_count:
-            final_sol, final_count = annealed_solution, annealed_count
-        if tabu_count < final_count:
-            final_sol, final_count = tabu_solution, tabu_count
-        if vns_count < final_count:
-            final_sol, final_count = vns_solution, vns_count
-
-        total_bins += final_count
-
-        output_json['res'].append({
-            'name': ins['name'],
-            'capacity': ins['capacity'],
-            'solution': final_sol
-        })
-
-        print(f"Instance: {ins['name']}")
-        print(f"Bins Used:\t{final_count} (Base: {base_count}, Annealed: {annealed_count}, Tabu: {tabu_count}, VNS: {vns_count}, Time: {time.time() - start_time_sol:.4f}s)")
-
-    total_time = time.time() - start_time
-    output_json['time'] = total_time
-    with open(output_filename, 'w+') as f:
-        json.dump(output_json, f, indent=4)
+    budget = max(0.0, TIME_BUDGET - (time.time() - start_time))
+    slices = allocate([instances[k] for k in pending], budget, [lbs[k] for k in pending], workers)
+    deadline = start_time + TIME_BUDGET
+    task_args = [(sl, deadline, history.skipped(size_class(instances[k])), lbs[k], ckpt_dir, initials[k], exact[k][1:])
+                 for k, sl in zip(pending, slices)]
+
+    # 各实例在进程池中并行求解，种子为原实例序号（与跳过了哪些实例无关），结果按原顺序逐个取回并写入文件
+    results = iter_results(solve_instance, [instances[k] for k in pending], seeds=pending,
+                           workers=workers, task_args=task_args)
+    pending_args = dict(zip(pending, task_args))
+
+    with SolutionWriter(output_filename, args.format) as writer:  # 每个实例求解完成就写入文件
+        total_cpu = 0.0
+        cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        for k, ins in enumerate(instances):
+            if k not in exact:
+                final_sol = ckpts[k].get('solution')
+                final_count = len(final_sol)
+                total_bins += final_count
+                total_cpu += ckpts[k].get('cpu', 0.0)
+                writer.write(ins, final_sol)
+
+                print(f"Instance: {ins['name']}")
+                print(f"Bins Used:\t{final_count} (Resumed from checkpoint, Time: {ckpts[k].get('elapsed', 0.0):.4f}s, CPU: {ckpts[k].get('cpu', 0.0):.4f}s)")
+                print(f"Lower Bound:\t{lbs[k]} (Proven Optimal: {final_count <= lbs[k]})")
+                continue
+
+            # 该实例累计的时间：之前各段（见检查点）+ 本段的精确求解 + 本段的启发式流程
+            (exact_sol, proven), exact_wall, exact_cpu = exact[k]
+            wall = ckpts[k].prior_wall + exact_wall
+            cpu = ckpts[k].prior_cpu + exact_cpu
+            if proven:
+                final_sol = exact_sol
+                final_count = len(final_sol)
+                total_bins += final_count
+                total_cpu += cpu
+                writer.write(ins, final_sol)
+                ckpts[k].finish(final_sol, elapsed=wall, cpu=cpu)
+
+                print(f"Instance: {ins['name']}")
+                print(f"Bins Used:\t{final_count} (Exact, Time: {wall:.4f}s, CPU: {cpu:.4f}s)")
+                print(f"Lower Bound:\t{lbs[k]} (Proven Optimal: True)")
+                continue
+
+            (final_sol, counts, times), solve_wall, solve_cpu = next(results)
+            wall += solve_wall
+            cpu += solve_cpu
+            skipped = pending_args[k][2]
+            # 精确求解超时时留下的当前最好解也参与比较
+            if exact_sol is not None and len(exact_sol) < len(final_sol):
+                final_sol = exact_sol
+            final_count = len(final_sol)
+            total_bins += final_count
+            total_cpu += cpu
+            for name in cache_stats:
+                cache_stats[name] += counts['Cache'][name]
+
+            writer.write(ins, final_sol)
+            ckpts[k].finish(final_sol, elapsed=wall, cpu=cpu)
+
+            print(f"Instance: {ins['name']}")
+            print(f"Bins Used:\t{final_count} (Base: {counts['Base']}, Annealed: {counts['Annealed']}, Tabu: {counts['Tabu']}, VNS: {counts['VNS']}, Time: {wall:.4f}s, CPU: {cpu:.4f}s)")
+            print(f"Lower Bound:\t{counts['LB']} (Proven Optimal: {final_count <= counts['LB']})")
+
+            # 记录各阶段相对于之前最好解的改进，供后续运行判断是否跳过
+            # （输入已经达到下界时该阶段没有改进空间，不计入记录；热启动的实例起点已经很好，也不计入）
+            key = size_class(ins)
+            prev = counts['Base']
+            for stage in STAGES[1:]:
+                if stage in skipped or prev <= counts['LB'] or initials[k] is not None:
+                    continue
+                # 续跑时直接取自检查点的步骤没有真实耗时，不计入记录
+                if stage in counts['Resumed']:
+                    prev = min(prev, counts[stage])
+                    continue
+                history.record(key, stage, max(0, prev - counts[stage]), times[stage])
+                prev = min(prev, counts[stage])
+
+        history.save()
+
+        total_time = clock.elapsed()
+        writer.close(total_time)
+    # BPP_INSTRUMENT 不为 off 时，子进程返回的各实例报告写到解文件旁边
+    report = write_report(output_filename)
+    clear_checkpoints(ckpt_dir)
 
     print("\n--- Summary ---")
     print(f"Output saved to {output_filename}")
     print(f"Total Used Bins: {total_bins}")
     print(f"Total Execution Time: {total_time:.4f}s")
+    print(f"Total CPU Time:       {total_cpu:.4f}s")
+    print(f"Eval Cache:           hits={cache_stats['hits']} misses={cache_stats['misses']} evictions={cache_stats['evictions']}")
+    if report:
+        print(f"Instrumentation report saved to {report}")
@@ -0,0 +1,73 @@
+import math
+import random
+import time
+from bin_state import BinState
+from instrument import count
+
+# 模拟退火二次改进
+# 在当前解上原地尝试移动或交换物品：代价为箱子数，增量 O(1) 计算，
+# 接受更优或以概率接受更差解，被拒绝的移动直接撤销，不再整解拷贝
+# 箱子数达到 lower_bound（已证明最优）时立即停止
+# 接受 / 拒绝 / 不可行（交换放不下）次数先在局部变量里累加，结束时一次性上报给 instrument
+# checkpoint 为 InstanceCheckpoint 时定期把当前解、最优解、温度和迭代数存到 'sa' 字段，
+# 其中已有 'sa' 字段时（续跑）从保存的状态继续，而不是从 bins 重新开始
+def simulated_annealing(bins, capacity, init_temp=100.0, alpha=0.95, min_temp=1e-3,
+                        max_iters=1000, time_limit=None, lower_bound=0, checkpoint=None):
+    saved = checkpoint.get('sa') if checkpoint is not None else None
+    if saved is not None:
+        bins = saved['bins']
+    state = BinState(bins, capacity)
+    if state.count() < 2 or state.count() <= lower_bound:
+        return state.to_bins() if saved is None else saved['best']
+    contents = state.contents
+    loads = state.loads
+    best = state.to_bins()
+    best_count = state.count()
+    temp = init_temp
+    iters = 0
+    if saved is not None:
+        best, temp, iters = saved['best'], saved['temp'], saved['iters']
+        best_count = len(best)
+    accepted = rejected = infeasible = 0
+    start = time.time()
+    while temp > min_temp and iters < max_iters:
+        # 每 1024 次检查一次时间，避免频繁调用 time.time()
+        if not iters & 1023:
+            if time_limit is not None and time.time() - start > time_limit:
+                break
+            if checkpoint is not None and checkpoint.due():
+                checkpoint.update(sa={'bins': state.to_bins(), 'best': best, 'temp': temp, 'iters': iters})
+        iters += 1
+        i = state.random_bin()
+        j = state.random_bin(exclude=i)
+        p = random.randrange(len(contents[i]))
+        item = contents[i][p]
+        if loads[j] + item <= capacity:
+            delta = state.move(i, p, j)
+            if delta <= 0 or random.random() < math.exp(-delta / temp):
+                accepted += 1
+                if state.count() < best_count:
+                    best = state.to_bins()
+                    best_count = state.count()
+                if state.count() < 2 or best_count <= lower_bound:
+                    break
+            else:
+                rejected += 1
+                state.undo_move(i, p, j)
+        else:
+            q = random.randrange(len(contents[j]))
+            j_item = contents[j][q]
+            # 交换不改变箱子数（delta = 0），可行即接受
+            if loads[i] - item + j_item <= capacity and loads[j] - j_item + item <= capacity:
+                state.swap(i, p, j, q)
+                accepted += 1
+            else:
+                infeasible += 1
+        temp *= alpha
+    count('sa.iterations', iters)
+    count('sa.accepted', accepted)
+    count('sa.rejected', rejected)
+    count('sa.infeasible', infeasible)
+    if checkpoint is not None:
+        checkpoint.discard('sa')
+    return best
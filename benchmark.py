@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from packing import best_fit, next_fit
+from random_search import random_search_fit
+from annealing import simulated_annealing
+from bounds import lower_bound
+from CW_marker import BEST_KNOWN, check_solution
+from instance_io import iter_instances
+from exact import exact_solve
+
+# 基准测试：固定种子、多次重复地在 CW_ins.json 的每个实例上运行所有算法，
+# 记录每个阶段的耗时、箱子数、与 BEST_KNOWN 的差距和峰值内存，结果写成 JSON，
+# 可与之前保存的基线文件对比，发现速度或质量的退化
+
+@contextmanager
+def phase(phases, name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - t
+
+# 各算法的适配器：参数与对应脚本 __main__ 中保持一致，返回解，并把各阶段耗时写入 phases
+def run_next_fit(ins, lb, phases):
+    with phase(phases, 'search'):
+        return random_search_fit(ins['items'], ins['capacity'], next_fit, lower_bound=lb)
+
+def run_bext_fit(ins, lb, phases):
+    with phase(phases, 'search'):
+        return random_search_fit(ins['items'], ins['capacity'], best_fit, lower_bound=lb)
+
+def run_first_descent(ins, lb, phases):
+    with phase(phases, 'search'):
+        return random_search_fit(ins['items'], ins['capacity'], best_fit, iterations=1000,
+                                 time_limit=30, improve=True, lower_bound=lb)
+
+def run_sa(ins, lb, phases):
+    with phase(phases, 'search'):
+        base = random_search_fit(ins['items'], ins['capacity'], best_fit, iterations=1000,
+                                 time_limit=60, improve=True, lower_bound=lb)
+    with phase(phases, 'anneal'):
+        annealed = simulated_annealing(base, ins['capacity'], init_temp=1000.0, lower_bound=lb)
+    return annealed if len(annealed) < len(base) else base
+
+def run_sa_2(ins, lb, phases):
+    import SA_2
+    solution, counts, times = SA_2.solve_instance(ins)
+    for name, t in times.items():
+        phases[name.lower()] = t
+    return solution
+
+def run_ga(ins, lb, phases):
+    import GA
+    with phase(phases, 'ga'):
+        return GA.genetic_fit(ins['items'], ins['capacity'], pop_size=100, generations=1000,
+                              crossover_rate=0.8, mutation_rate=0.1, time_limit=60,
+                              lower_bound=lb)
+
+def run_pso(ins, lb, phases):
+    import PSO
+    with phase(phases, 'pso'):
+        return PSO.pso_search(ins['items'], ins['capacity'], num_particles=50, iterations=500,
+                              w=1.0, c1=1.5, c2=1.5, vmax=1.0, time_limit=30,
+                              lower_bound=lb)
+
+def run_llh(ins, lb, phases):
+    import LLH
+    with phase(phases, 'llh'):
+        solution = LLH.hyper_heuristic_search(ins['items'], ins['capacity'],
+                                              epsilon=0.15, max_restarts=100, lower_bound=lb)
+    if len(solution) <= lb:
+        return solution
+    with phase(phases, 'perturbative'):
+        return LLH.perturbative_search(solution, ins['capacity'], lower_bound=lb,
+                                       time_limit=LLH.PERTURB_TIME_LIMIT)
+
+def run_exact(ins, lb, phases):
+    with phase(phases, 'exact'):
+        solution, _ = exact_solve(ins['items'], ins['capacity'], time_limit=10, lower_bound=lb)
+    return solution
+
+SOLVERS = {
+    'next_fit': run_next_fit,
+    'bext_fit': run_bext_fit,
+    'first_descent': run_first_descent,
+    'SA': run_sa,
+    'SA_2': run_sa_2,
+    'GA': run_ga,
+    'PSO': run_pso,
+    'LLH': run_llh,
+    'exact': run_exact
+}
+
+# 校验解是否合法（容量和物品完整性），不合法的记录在结果里标出
+def is_valid(ins, solution):
+    if solution is None:
+        return False
+    errors, _ = check_solution(ins['items'], ins['capacity'], {'solution': solution})
+    return not errors
+
+def run_trial(solver, ins, best_known, seed, track_memory=True):
+    random.seed(seed)
+    phases = {}
+    if track_memory:
+        tracemalloc.start()
+    t = time.perf_counter()
+    with phase(phases, 'bound'):
+        lb = lower_bound(ins['items'], ins['capacity'])
+    # 各算法会打印进度信息，这里不做屏蔽，保持与直接运行脚本一致
+    solution = SOLVERS[solver](ins, lb, phases)
+    wall = time.perf_counter() - t
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    bins = len(solution) if solution is not None else None
+    return {
+        'solver': solver,
+        'instance': ins['name'],
+        'seed': seed,
+        'bins': bins,
+        'best_known': best_known,
+        'gap': None if bins is None or best_known is None else bins - best_known,
+        'lower_bound': lb,
+        'valid': is_valid(ins, solution),
+        'time': wall,
+        'phases': phases,
+        'peak_kb': None if peak is None else peak / 1024
+    }
+
+# best_known: 实例名 -> 已知最好箱子数
+def run_benchmark(instances, solvers, best_known, trials=3, seed=0, track_memory=True):
+    records = []
+    for solver in solvers:
+        for ins in instances:
+            for trial in range(trials):
+                rec = run_trial(solver, ins, best_known.get(ins['name']), seed + trial, track_memory)
+                rec['trial'] = trial
+                records.append(rec)
+                print(f"[bench] {solver:14s} {ins['name']:18s} trial {trial}: "
+                      f"bins={rec['bins']} gap={rec['gap']} time={rec['time']:.3f}s")
+    return records
+
+# 按 (算法, 实例) 汇总：平均箱子数、最好箱子数、平均耗时、最大峰值内存
+def summarize(records):
+    groups = {}
+    for rec in records:
+        groups.setdefault((rec['solver'], rec['instance']), []).append(rec)
+    summary = []
+    for (solver, name), recs in groups.items():
+        bins = [r['bins'] for r in recs if r['bins'] is not None]
+        peaks = [r['peak_kb'] for r in recs if r['peak_kb'] is not None]
+        summary.append({
+            'solver': solver,
+            'instance': name,
+            'trials': len(recs),
+            'mean_bins': sum(bins) / len(bins) if bins else None,
+            'best_bins': min(bins) if bins else None,
+            'mean_time': sum(r['time'] for r in recs) / len(recs),
+            'max_peak_kb': max(peaks) if peaks else None,
+            'all_valid': all(r['valid'] for r in recs)
+        })
+    return summary
+
+# 与基线对比：同一 (算法, 实例) 下平均箱子数变多算质量退化，
+# 平均耗时超过 基线 * time_ratio + time_slack 算速度退化
+def compare(summary, baseline_summary, time_ratio=1.25, time_slack=0.05):
+    base = {(s['solver'], s['instance']): s for s in baseline_summary}
+    regressions = []
+    for s in summary:
+        b = base.get((s['solver'], s['instance']))
+        if b is None:
+            continue
+        if not s['all_valid']:
+            regressions.append((s['solver'], s['instance'], 'invalid solution'))
+        if s['mean_bins'] is not None and b['mean_bins'] is not None and s['mean_bins'] > b['mean_bins']:
+            regressions.append((s['solver'], s['instance'],
+                                f"bins {b['mean_bins']:.2f} -> {s['mean_bins']:.2f}"))
+        if s['mean_time'] > b['mean_time'] * time_ratio + time_slack:
+            regressions.append((s['solver'], s['instance'],
+                                f"time {b['mean_time']:.3f}s -> {s['mean_time']:.3f}s"))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark all bin packing solvers on CW_ins.json')
+    parser.add_argument('--solvers', nargs='+', default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument('--instances', nargs='+', default=None, help='instance names (default: all)')
+    parser.add_argument('--trials', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help='previous results file to compare against')
+    parser.add_argument('--time-ratio', type=float, default=1.25)
+    parser.add_argument('--time-slack', type=float, default=0.05)
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc peak memory tracking')
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    instances = list(iter_instances(os.path.join(script_dir, 'CW_ins.json')))
+    best_known = dict(zip((ins['name'] for ins in instances), BEST_KNOWN))
+    if args.instances:
+        instances = [ins for ins in instances if ins['name'] in args.instances]
+
+    records = run_benchmark(instances, args.solvers, best_known, args.trials, args.seed, not args.no_memory)
+    summary = summarize(records)
+    result = {
+        'date': datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'trials': args.trials,
+        'seed': args.seed,
+        'memory_tracked': not args.no_memory,
+        'records': records,
+        'summary': summary
+    }
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print("\n--- Summary ---")
+    for s in summary:
+        print(f"{s['solver']:14s} {s['instance']:18s} bins={s['mean_bins']:.2f} "
+              f"(best {s['best_bins']}) time={s['mean_time']:.3f}s")
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline['summary'], args.time_ratio, args.time_slack)
+        print("\n--- Regressions ---")
+        for solver, name, what in regressions:
+            print(f"{solver:14s} {name:18s} {what}")
+        if regressions:
+            raise SystemExit(1)
+        print("None")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import random
+
+# 数组化的解：每个箱子一个物品列表 + 缓存负载，
+# alive 保存所有非空箱子的编号，pos 记录编号在 alive 中的位置，便于 O(1) 随机抽取和删除
+class BinState:
+    __slots__ = ('capacity', 'contents', 'loads', 'alive', 'pos')
+
+    def __init__(self, bins, capacity):
+        self.capacity = capacity
+        self.contents = [list(b) for b in bins if b]
+        self.loads = [sum(b) for b in self.contents]
+        self.alive = list(range(len(self.contents)))
+        self.pos = list(range(len(self.contents)))
+
+    def count(self):
+        return len(self.alive)
+
+    def _kill(self, b):
+        alive, pos = self.alive, self.pos
+        k = pos[b]
+        last = alive[-1]
+        alive[k] = last
+        pos[last] = k
+        alive.pop()
+        pos[b] = -1
+
+    def _revive(self, b):
+        self.pos[b] = len(self.alive)
+        self.alive.append(b)
+
+    # 随机取一个非空箱子；exclude 不为 None 时从其余箱子中取
+    def random_bin(self, exclude=None):
+        alive = self.alive
+        if exclude is None:
+            return alive[random.randrange(len(alive))]
+        k = random.randrange(len(alive) - 1)
+        if k >= self.pos[exclude]:
+            k += 1
+        return alive[k]
+
+    def fits(self, b, size):
+        return self.loads[b] + size <= self.capacity
+
+    # 把箱子 i 中第 p 个物品移到箱子 j（与末尾交换后弹出，O(1)），返回箱子数变化量
+    def move(self, i, p, j):
+        src = self.contents[i]
+        item = src[p]
+        src[p] = src[-1]
+        src.pop()
+        self.contents[j].append(item)
+        self.loads[i] -= item
+        self.loads[j] += item
+        if not src:
+            self._kill(i)
+            return -1
+        return 0
+
+    # 撤销 move(i, p, j)：物品位于箱子 j 末尾，放回箱子 i 的第 p 个位置
+    def undo_move(self, i, p, j):
+        item = self.contents[j].pop()
+        src = self.contents[i]
+        if not src:
+            self._revive(i)
+        if p == len(src):
+            src.append(item)
+        else:
+            src.append(src[p])
+            src[p] = item
+        self.loads[i] += item
+        self.loads[j] -= item
+
+    # 交换箱子 i 的第 p 个物品与箱子 j 的第 q 个物品（箱子数不变，可用同一调用撤销）
+    def swap(self, i, p, j, q):
+        a = self.contents[i][p]
+        b = self.contents[j][q]
+        self.contents[i][p] = b
+        self.contents[j][q] = a
+        self.loads[i] += b - a
+        self.loads[j] += a - b
+
+    # 把物品放到箱子 b 的末尾（b 为空箱子时重新启用），返回箱子数变化量
+    def add(self, b, item):
+        dst = self.contents[b]
+        dst.append(item)
+        self.loads[b] += item
+        if len(dst) == 1:
+            self._revive(b)
+            return 1
+        return 0
+
+    # 取出箱子 b 末尾的物品（撤销 add），返回 (物品, 箱子数变化量)
+    def pop(self, b):
+        src = self.contents[b]
+        item = src.pop()
+        self.loads[b] -= item
+        if not src:
+            self._kill(b)
+            return item, -1
+        return item, 0
+
+    # 新建一个空箱子（放入物品后才计入 alive），返回编号
+    def new_bin(self):
+        self.contents.append([])
+        self.loads.append(0)
+        self.pos.append(-1)
+        return len(self.contents) - 1
+
+    # 删掉编号 >= n 的箱子（必须都已为空），撤销时丢掉期间 new_bin 建出来的箱子
+    def truncate(self, n):
+        del self.contents[n:]
+        del self.loads[n:]
+        del self.pos[n:]
+
+    # 导出为 list-of-lists 形式的解（只含非空箱子）
+    def to_bins(self):
+        return [list(self.contents[b]) for b in sorted(self.alive)]
@@ -0,0 +1,98 @@
+import math
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+# 下界计算：L1 连续下界，Martello–Toth 的 L2 与基于约简的 L3
+# 所有函数只看物品尺寸和容量，可在求解前对每个实例算一次
+
+# L1：总体积除以容量向上取整
+def l1_bound(items, capacity):
+    return math.ceil(sum(items) / capacity) if items else 0
+
+# L2：对每个阈值 K (0 <= K <= C/2) 把物品分成
+#   J1 = {w > C-K}, J2 = {C/2 < w <= C-K}, J3 = {K <= w <= C/2}
+# J1、J2 的物品两两不能同箱；J3 的物品最多用掉 J2 箱子的剩余空间，其余体积至少还要这么多箱
+def l2_bound(items, capacity):
+    if not items:
+        return 0
+    sizes = sorted(items)
+    prefix = [0]
+    for w in sizes:
+        prefix.append(prefix[-1] + w)
+    n = len(sizes)
+    half = bisect_right(sizes, capacity // 2)  # sizes[half:] 都满足 2w > C
+    best = 0
+    for k in [0] + sorted(set(sizes[:half])):
+        lo = bisect_left(sizes, k)              # J3 = sizes[lo:half]
+        hi = bisect_right(sizes, capacity - k)  # J2 = sizes[half:hi], J1 = sizes[hi:]
+        n12 = n - half
+        j2_free = (hi - half) * capacity - (prefix[hi] - prefix[half])
+        j3_sum = prefix[half] - prefix[lo]
+        extra = max(0, math.ceil((j3_sum - j2_free) / capacity))
+        best = max(best, n12 + extra)
+    return best
+
+# Martello–Toth 约简（只考虑至多两件物品的箱子）：从最大的物品 i 开始，
+# 若没有物品能和它同箱，则 {i} 单独成箱；若能放下的最大物品 j 恰好装满，
+# 或剩余物品中任意两件都放不进 i 的剩余空间，则 {i, j} 是支配解，可直接固定
+# 返回 (固定下来的箱子数, 剩余未约简的物品)
+def reduce_instance(items, capacity):
+    count = Counter(w for w in items if w <= capacity)
+    sizes = sorted(count)
+    fixed = 0
+
+    def largest_fitting(limit):
+        pos = bisect_right(sizes, limit) - 1
+        while pos >= 0:
+            if count[sizes[pos]]:
+                return sizes[pos]
+            pos -= 1
+        return None
+
+    def two_smallest_sum():
+        first = None
+        for w in sizes:
+            c = count[w]
+            if not c:
+                continue
+            if first is not None:
+                return first + w
+            if c >= 2:
+                return 2 * w
+            first = w
+        return None
+
+    for s in reversed(sizes):
+        while count[s]:
+            count[s] -= 1
+            residual = capacity - s
+            j = largest_fitting(residual)
+            if j is None:
+                fixed += 1
+                continue
+            pair = two_smallest_sum()
+            if j == residual or pair is None or pair > residual:
+                count[j] -= 1
+                fixed += 1
+                continue
+            # 不可约：该尺寸剩下的物品都留给剩余实例
+            count[s] += 1
+            break
+    rest = [w for w in sizes for _ in range(count[w])]
+    return fixed, rest
+
+# L3：约简固定的箱子数 + 剩余实例的 L2
+def l3_bound(items, capacity):
+    fixed, rest = reduce_instance(items, capacity)
+    return fixed + l2_bound(rest, capacity)
+
+def lower_bounds(items, capacity):
+    return {
+        'L1': l1_bound(items, capacity),
+        'L2': l2_bound(items, capacity),
+        'L3': l3_bound(items, capacity)
+    }
+
+# 实例的最好下界：箱子数达到它即证明最优
+def lower_bound(items, capacity):
+    return max(lower_bounds(items, capacity).values())
@@ -0,0 +1,116 @@
+import os
+import pickle
+import random
+import re
+import shutil
+import time
+
+# 断点续跑：每个实例一个检查点文件（<解文件名>.ckpt/<实例名>.pkl），记录
+#   - 已完成实例的最终解（done / solution）
+#   - 多阶段流程里已完成阶段的结果（由调用方自定字段）
+#   - 正在运行的算法的搜索状态：GA 种群、PSO 粒子群、退火的当前解与温度、禁忌表等，
+#     键名分别为 'ga' / 'pso' / 'sa' / 'tabu'，由算法自己按 interval 秒的间隔保存
+# 每个实例的文件只由求解它的那个进程写，多进程并行时互不干扰；先写临时文件再 os.replace，
+# 中途被杀掉也不会留下半个文件。每次保存都带上 random 模块的状态，续跑时恢复
+# 各算法的时限在续跑时重新计时（保存的只是搜索进度，不是已经用掉的时间）
+# 报告用的耗时则跨续跑累计：每次保存都记下该实例至今的墙钟 / CPU 时间（'elapsed' / 'cpu'），
+# 整个运行的耗时由 RunClock 记录，续跑得到的报告与一次跑完的相同
+
+CHECKPOINT_INTERVAL = 30
+
+def checkpoint_dir(solution_path):
+    root, _ = os.path.splitext(solution_path)
+    return root + '.ckpt'
+
+# 新的一次运行（非 --resume）清掉旧的检查点；整个运行正常结束后也删掉
+def clear_checkpoints(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+class InstanceCheckpoint:
+    def __init__(self, directory, name, interval=CHECKPOINT_INTERVAL):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, re.sub(r'[^\w.-]', '_', name) + '.pkl')
+        self.interval = interval
+        self.data = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                self.data = pickle.load(f)
+        self.last = time.time()
+        # 之前各段运行在该实例上用掉的时间，本段从创建本对象时开始计
+        self.prior_wall = self.data.get('elapsed', 0.0)
+        self.prior_cpu = self.data.get('cpu', 0.0)
+        self.wall0 = self.last
+        self.cpu0 = time.process_time()
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def done(self):
+        return self.data.get('done', False)
+
+    # 距离上次保存已超过 interval 秒
+    def due(self):
+        return time.time() - self.last >= self.interval
+
+    # 该实例累计的墙钟 / CPU 时间（本进程在创建本对象之后一直在求解该实例时才准确）
+    def elapsed(self):
+        return self.prior_wall + time.time() - self.wall0
+
+    def cpu(self):
+        return self.prior_cpu + time.process_time() - self.cpu0
+
+    # 本段在别的进程里已经花在该实例上的时间（例如主进程里的精确求解）也计入累计时间
+    def charge(self, wall, cpu):
+        self.prior_wall += wall
+        self.prior_cpu += cpu
+
+    # 更新若干字段并立即写盘；值为 None 的字段被删除
+    # 未显式给出 elapsed / cpu 时记下 elapsed() / cpu()（不在求解进程里保存时应显式给出）
+    def update(self, **fields):
+        for key, value in fields.items():
+            if value is None:
+                self.data.pop(key, None)
+            else:
+                self.data[key] = value
+        if 'elapsed' not in fields:
+            self.data['elapsed'] = self.elapsed()
+        if 'cpu' not in fields:
+            self.data['cpu'] = self.cpu()
+        self.data['random'] = random.getstate()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self.data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self.last = time.time()
+
+    # 算法正常结束时丢掉自己的搜索状态（不单独写盘，随下一次 update 一起写出）
+    def discard(self, key):
+        self.data.pop(key, None)
+
+    # 续跑时恢复上次保存时 random 模块的状态
+    def restore_random(self):
+        state = self.data.get('random')
+        if state is not None:
+            random.setstate(state)
+
+    def finish(self, solution, **fields):
+        self.update(done=True, solution=solution, **fields)
+
+# 整个运行的累计墙钟时间，记录在检查点目录的 run.clock 里（本段开始的时间 start 和之前各段的总耗时）
+# 续跑时上一段的结束时间取目录里最后写入的文件的修改时间（各实例按 interval 定期保存，误差不超过一个间隔）
+class RunClock:
+    def __init__(self, directory, resume=False, start=None):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'run.clock')
+        self.prior = 0.0
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                saved = pickle.load(f)
+            last = max(os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory))
+            self.prior = saved['prior'] + max(0.0, last - saved['start'])
+        self.start = time.time() if start is None else start
+        with open(self.path, 'wb') as f:
+            pickle.dump({'prior': self.prior, 'start': self.start}, f)
+
+    def elapsed(self):
+        return self.prior + time.time() - self.start
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+# 解码结果缓存（置换表）：物品尺寸序列相同的排列，解码结果必然相同
+# 键为 (标签, 容量, 长度, 尺寸序列的 64 位哈希)，标签区分解码器 / 是否做局部搜索等；
+# 值为 (箱子数, 解)，解可以为 None（只缓存箱子数）。超过 maxsize 时淘汰最久未使用的条目
+# 注意：命中时返回的是缓存里的同一个解对象，调用方不要原地修改它
+class EvalCache:
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # seq 可以是 list / array('i') / numpy 数组：数组直接哈希底层字节，list 哈希成 tuple（都在 C 里完成）
+    @staticmethod
+    def key(seq, capacity, tag=None):
+        h = hash(seq.tobytes()) if hasattr(seq, 'tobytes') else hash(tuple(seq))
+        return (tag, capacity, len(seq), h)
+
+    # 返回 (箱子数, 解)，未命中返回 None
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, count, solution=None):
+        self.entries[key] = (count, solution)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # 批量查询箱子数：命中的直接取缓存，未命中的交给 evaluate(未命中序列的列表) 一次算完后写回
+    # evaluate 可以对被剪枝的序列返回 None（packing.DOMINATED）：它只相对当时的最好解成立，不写入缓存
+    def lookup_counts(self, seqs, capacity, tag, evaluate):
+        keys = [self.key(s, capacity, tag) for s in seqs]
+        counts = [None] * len(seqs)
+        todo = []
+        for i, k in enumerate(keys):
+            entry = self.get(k)
+            if entry is None:
+                todo.append(i)
+            else:
+                counts[i] = entry[0]
+        if todo:
+            for i, c in zip(todo, evaluate([seqs[i] for i in todo])):
+                counts[i] = c
+                if c is not None:
+                    self.put(keys[i], c)
+        return counts
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.entries)}
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return (f"hits={self.hits} misses={self.misses} evictions={self.evictions} "
+                f"(hit rate {rate:.1f}%)")
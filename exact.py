@@ -0,0 +1,113 @@
+import time
+from histogram import Histogram, pattern_best_fit, pattern_local_search
+from bounds import lower_bound as instance_lower_bound
+from instrument import count
+
+# 小容量实例的精确求解：在尺寸直方图上做 bin-completion 式的分支定界
+# 状态是各尺寸剩余的个数（需求向量），每一层为“当前最大的剩余物品”所在的箱子选一个模式，
+# 只考虑对剩余需求极大的模式（再也放不进任何剩余物品），按负载从大到小尝试
+# 剪枝：总浪费空间不能超过 目标箱数 * 容量 - 总体积；已证明不可行的 (需求, 剩余箱数) 记入表中
+# 目标箱数从下界开始逐个尝试，第一个可行的目标即最优；超时则返回启发式的当前最好解
+
+# 可行模式的个数随容量快速增长，只对容量不超过它的实例做精确求解
+MAX_CAPACITY = 32
+
+def exact_applicable(capacity):
+    return capacity <= MAX_CAPACITY
+
+class _Timeout(Exception):
+    pass
+
+class _Search:
+    def __init__(self, sizes, capacity, deadline):
+        self.sizes = sizes
+        self.capacity = capacity
+        self.deadline = deadline
+        self.failed = {}      # 需求向量 -> 已证明不可行的最大剩余箱数
+        self.nodes = 0
+
+    # 包含尺寸 first 的、对 demand 极大的所有可行模式，按负载从大到小
+    def patterns(self, demand, first):
+        sizes = self.sizes
+        d = len(sizes)
+        out = []
+        p = [0] * d
+        p[first] = 1
+
+        def rec(j, residual):
+            if j == d:
+                # 极大性：没有剩余物品还能放进这个箱子
+                for k in range(d):
+                    if p[k] < demand[k] and sizes[k] <= residual:
+                        return
+                out.append((self.capacity - residual, tuple(p)))
+                return
+            avail = demand[j] - p[j]
+            top = min(avail, residual // sizes[j])
+            base = p[j]
+            for c in range(top, -1, -1):
+                p[j] = base + c
+                rec(j + 1, residual - c * sizes[j])
+            p[j] = base
+
+        rec(first, self.capacity - sizes[first])
+        out.sort(key=lambda x: -x[0])
+        return out
+
+    # 能否用 bins_left 个箱子装下 demand，waste_left 为还允许浪费的空间；可行时返回模式列表（最后选的在前）
+    # 每个箱子一层，大实例需要上千层，所以用显式栈做深度优先搜索而不是递归
+    def solve(self, demand, bins_left, waste_left):
+        stack = []      # 每层 [需求, 剩余箱数, 允许浪费, 模式列表, 下一个要试的模式下标]
+        while True:
+            # 进入节点 (demand, bins_left, waste_left)
+            first = next((k for k, c in enumerate(demand) if c), -1)
+            if first < 0:
+                return [frame[3][frame[4] - 1][1] for frame in reversed(stack)]
+            if bins_left > 0 and bins_left > self.failed.get(demand, 0):
+                self.nodes += 1
+                if not self.nodes & 1023 and time.time() > self.deadline:
+                    raise _Timeout
+                stack.append([demand, bins_left, waste_left, self.patterns(demand, first), 0])
+            # 在栈顶节点上试下一个模式；模式用完（或浪费超限）时记为不可行并回溯
+            while stack:
+                frame = stack[-1]
+                demand, bins_left, waste_left, patterns, k = frame
+                if k < len(patterns) and self.capacity - patterns[k][0] <= waste_left:
+                    frame[4] = k + 1
+                    load, p = patterns[k]
+                    demand = tuple(a - b for a, b in zip(demand, p))
+                    bins_left -= 1
+                    waste_left -= self.capacity - load
+                    break
+                self.failed[demand] = bins_left
+                stack.pop()
+            else:
+                return None
+
+# 返回 (解, 是否已证明最优)；lower_bound 为 None 时自动计算
+# 解为物品列表形式；超时时返回 BFD + 合并局部搜索得到的解（或传入的 incumbent，取较好者）
+def exact_solve(items, capacity, time_limit=10, lower_bound=None, incumbent=None):
+    hist = Histogram(items)
+    if lower_bound is None:
+        lower_bound = instance_lower_bound(items, capacity)
+    groups = pattern_local_search(pattern_best_fit(hist.decreasing(), hist.sizes, capacity),
+                                  hist.sizes, capacity)
+    best = hist.expand(groups)
+    if incumbent is not None and len(incumbent) < len(best):
+        best = incumbent
+    if len(best) <= lower_bound or any(s > capacity for s in hist.sizes):
+        return best, len(best) <= lower_bound
+    search = _Search(hist.sizes, capacity, time.time() + time_limit)
+    demand = tuple(hist.counts)
+    volume = sum(c * s for c, s in zip(hist.counts, hist.sizes))
+    try:
+        for target in range(lower_bound, len(best)):
+            patterns = search.solve(demand, target, target * capacity - volume)
+            if patterns is not None:
+                return hist.expand([(p, 1) for p in reversed(patterns)]), True
+    except _Timeout:
+        return best, False
+    finally:
+        count('exact.nodes', search.nodes)
+    # 所有更小的目标都不可行：当前最好解就是最优解
+    return best, True
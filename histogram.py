@@ -0,0 +1,250 @@
+from collections import Counter, deque
+import numpy as np
+from packing import ResidualIndex, first_improvement_groups
+from instrument import count
+
+# 小容量实例的直方图表示：物品只有少数几种尺寸，每种重复很多次
+# 实例存为 (尺寸, 个数)；箱子存为“模式向量”（第 k 位是第 k 种尺寸放了几个，尺寸从大到小），
+# 解存为 [(模式, 箱子数), ...]，按箱子顺序排列，相同模式的相邻箱子合成一组
+# 解码器按“连续相同尺寸的一段”(run) 处理物品，按组处理箱子：
+#   Best/First Fit 下，同一段物品会连续放进同一个箱子直到放不下，然后换到下一个箱子，
+#   而同一组里的箱子完全相同，所以一次就能算出这一组里有几个箱子被装满、几个没动
+# 得到的箱子序列与逐个物品解码完全一致（箱内物品顺序除外），只有输出时才展开成物品列表
+
+# 不同尺寸数远小于物品数时才值得用直方图表示
+def use_histogram(items, ratio=4):
+    return len(set(items)) * ratio <= len(items)
+
+class Histogram:
+    def __init__(self, items):
+        counter = Counter(items)
+        self.sizes = sorted(counter, reverse=True)
+        self.counts = [counter[s] for s in self.sizes]
+        # 尺寸 -> 模式向量中的下标
+        self.code = np.zeros(self.sizes[0] + 1 if self.sizes else 1, dtype=np.int64)
+        self.code[self.sizes] = np.arange(len(self.sizes))
+
+    # 把一个物品顺序压缩成 [(尺寸下标, 连续个数), ...]
+    def runs(self, order):
+        codes = self.code[np.asarray(order, dtype=np.int64)]
+        if not len(codes):
+            return []
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1, [len(codes)]))
+        return list(zip(codes[bounds[:-1]].tolist(), np.diff(bounds).tolist()))
+
+    # 从大到小的顺序：每种尺寸恰好一段
+    def decreasing(self):
+        return list(enumerate(self.counts))
+
+    # 展开成物品列表（写结果时使用）
+    def expand(self, groups):
+        bins = []
+        for pattern, g in groups:
+            b = []
+            for s, c in zip(self.sizes, pattern):
+                if c:
+                    b += [s] * c
+            bins += [list(b) for _ in range(g)]
+        return bins
+
+def bin_count(groups):
+    return sum(g for _, g in groups)
+
+def _add(pattern, k, m):
+    return pattern[:k] + (pattern[k] + m,) + pattern[k + 1:]
+
+def _load(pattern, sizes):
+    return sum(c * s for c, s in zip(pattern, sizes))
+
+# 合并相邻的相同模式组，按起始箱号输出 [(模式, 箱子数), ...]
+def _to_groups(groups):
+    out = []
+    for start in sorted(groups):
+        pattern, g = groups[start]
+        if out and out[-1][0] == pattern:
+            out[-1] = (pattern, out[-1][1] + g)
+        else:
+            out.append((pattern, g))
+    return out
+
+# groups: 起始箱号 -> (模式, 箱子数)；每组的箱子编号连续，残余容量索引里存的是组的起始箱号，
+# 所以“同残余取序号最小”的规则和逐箱版本一致
+def _group_fit(runs, sizes, capacity, pop):
+    zero = (0,) * len(sizes)
+    groups = {}
+    index = ResidualIndex()
+    nbins = 0
+    for k, cnt in runs:
+        s = sizes[k]
+        while cnt:
+            start, residual = pop(index, s)
+            if start < 0:
+                # 现有箱子都放不下：新箱子依次各装 capacity // s 个，最后一个装剩下的
+                # （超过容量的物品各占一个新箱子，与逐个解码的行为一致）
+                per = capacity // s or 1
+                full, rest = divmod(cnt, per)
+                for m, g in ((per, full), (rest, 1 if rest else 0)):
+                    if g:
+                        groups[nbins] = (_add(zero, k, m), g)
+                        index.add(capacity - m * s, nbins)
+                        nbins += g
+                cnt = 0
+                continue
+            # 组里的箱子依次各装 m 个，装满 full 个；剩下的物品不够装满时放进下一个箱子
+            pattern, g = groups.pop(start)
+            m = min(cnt, residual // s)
+            full = min(g, cnt // m)
+            groups[start] = (_add(pattern, k, m), full)
+            index.add(residual - m * s, start)
+            cnt -= full * m
+            pos = start + full
+            if pos < start + g and cnt:
+                groups[pos] = (_add(pattern, k, cnt), 1)
+                index.add(residual - cnt * s, pos)
+                pos += 1
+                cnt = 0
+            if pos < start + g:
+                groups[pos] = (pattern, start + g - pos)
+                index.add(residual, pos)
+    return _to_groups(groups)
+
+def pattern_best_fit(runs, sizes, capacity):
+    count('decode.pattern_best_fit')
+    return _group_fit(runs, sizes, capacity, ResidualIndex.pop_best)
+
+def pattern_first_fit(runs, sizes, capacity):
+    count('decode.pattern_first_fit')
+    return _group_fit(runs, sizes, capacity, ResidualIndex.pop_first)
+
+def pattern_next_fit(runs, sizes, capacity):
+    count('decode.pattern_next_fit')
+    zero = (0,) * len(sizes)
+    groups = []
+    current = None
+    residual = 0
+    for k, cnt in runs:
+        s = sizes[k]
+        m = min(cnt, residual // s) if residual > 0 else 0
+        if m:
+            current = _add(current, k, m)
+            residual -= m * s
+            cnt -= m
+        if cnt:
+            if current is not None:
+                groups.append((current, 1))
+            # 中间的箱子各装满 capacity // s 个后封箱，最后一个保持打开
+            per = capacity // s or 1
+            full, rest = divmod(cnt, per)
+            if rest == 0:
+                full, rest = full - 1, per
+            if full:
+                groups.append((_add(zero, k, per), full))
+            current = _add(zero, k, rest)
+            residual = capacity - rest * s
+    if current is not None:
+        groups.append((current, 1))
+    return _to_groups(dict(enumerate(groups)))
+
+# 与 packing.merge_pass 相同的一轮合并：把箱子当作物品按负载从大到小做 Best Fit
+# 负载相同的一段箱子依次并进同一个保留箱直到放不下；保留箱所在的组若和来源组都是整组，
+# 一次处理 min(保留组箱子数, 来源箱子数 // 每箱能并入的个数) 个保留箱
+# 返回 (新的组列表, 合并掉的箱子数)
+def pattern_merge_pass(groups, sizes, capacity):
+    entries = []
+    pos = 0
+    for pattern, g in groups:
+        entries.append((pos, pattern, g, _load(pattern, sizes)))
+        pos += g
+    # 稳定排序：负载相同的组保持箱子顺序
+    entries.sort(key=lambda e: -e[3])
+    result = {}
+    index = ResidualIndex()
+    merged = 0
+    i = 0
+    while i < len(entries):
+        load = entries[i][3]
+        j = i
+        while j < len(entries) and entries[j][3] == load:
+            j += 1
+        queue = deque([start, pattern, g] for start, pattern, g, _ in entries[i:j])
+        i = j
+        while queue:
+            head = queue[0]
+            keep, residual = index.pop_best(load)
+            if keep < 0:
+                # 没有能并入的保留箱：队首的第一个箱子成为新的保留箱
+                result[head[0]] = (head[1], 1)
+                index.add(capacity - load, head[0])
+                head[0] += 1
+                head[2] -= 1
+                if not head[2]:
+                    queue.popleft()
+                continue
+            kpattern, kg = result.pop(keep)
+            m = residual // load if load else sum(e[2] for e in queue)
+            if head[2] >= m:
+                # 来源组足够整组处理：x 个保留箱各并入 m 个相同的箱子
+                x = min(kg, head[2] // m)
+                result[keep] = (tuple(a + m * b for a, b in zip(kpattern, head[1])), x)
+                index.add(residual - m * load, keep)
+                head[0] += x * m
+                head[2] -= x * m
+                if not head[2]:
+                    queue.popleft()
+                merged += x * m
+            else:
+                # 单个保留箱依次并入接下来最多 m 个箱子（可能来自不同的组）
+                x = 1
+                pattern = kpattern
+                taken = 0
+                while taken < m and queue:
+                    head = queue[0]
+                    t = min(m - taken, head[2])
+                    pattern = tuple(a + t * b for a, b in zip(pattern, head[1]))
+                    head[0] += t
+                    head[2] -= t
+                    if not head[2]:
+                        queue.popleft()
+                    taken += t
+                result[keep] = (pattern, 1)
+                index.add(residual - taken * load, keep)
+                merged += taken
+            if x < kg:
+                result[keep + x] = (kpattern, kg - x)
+                index.add(residual, keep + x)
+    count('merge.attempted', pos)
+    count('merge.applied', merged)
+    return _to_groups(result), merged
+
+# 组表示上的合并局部搜索，结果与 packing.local_search 一致：
+# 整轮合并在组上进行；逐对 first-improvement 合并与箱子顺序有关，展开成逐箱负载计算，更少时改用它的结果
+def pattern_local_search(groups, sizes, capacity, max_iters=100):
+    if bin_count(groups) < 2:
+        return groups
+    loads = sorted((_load(p, sizes), g) for p, g in groups)
+    low = loads[0][0] + (loads[0][0] if loads[0][1] > 1 else loads[1][0])
+    if low > capacity:
+        return groups
+    patterns = [p for p, g in groups for _ in range(g)]
+    first = first_improvement_groups([_load(p, sizes) for p in patterns], capacity)
+    for _ in range(max_iters):
+        if bin_count(groups) < 2:
+            break
+        # 最轻的两个箱子都合并不了，就不可能再有改进
+        loads = sorted((_load(p, sizes), g) for p, g in groups)
+        low = loads[0][0] + (loads[0][0] if loads[0][1] > 1 else loads[1][0])
+        if low > capacity:
+            break
+        groups, merged = pattern_merge_pass(groups, sizes, capacity)
+        if not merged:
+            break
+    if len(first) < bin_count(groups):
+        count('merge.first_improvement')
+        merged = {}
+        for k, members in enumerate(first):
+            pattern = patterns[members[0]]
+            for j in members[1:]:
+                pattern = tuple(a + b for a, b in zip(pattern, patterns[j]))
+            merged[k] = (pattern, 1)
+        return _to_groups(merged)
+    return groups
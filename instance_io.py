@@ -0,0 +1,118 @@
+import json
+from array import array
+
+# 流式读取实例文件：按块读入，逐个解析顶层数组中的实例对象并立即交出，
+# 'items' 数组直接解析进紧凑的 array('i')（或 numpy int32 数组），不生成装箱的 int 列表
+# 其余字段（name、capacity 等）较小，用标准 json 解码
+
+CHUNK_SIZE = 1 << 16
+_WS = ' \t\r\n'
+
+class _Scanner:
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    # 读入更多数据；已消费的部分丢弃，缓冲区只保留未解析的尾部
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, ch):
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos}, got {got!r}")
+        self.pos += 1
+
+    # 解码一个完整的 JSON 值；值被块边界截断时补读后重试
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                val, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # 数字可能恰好在块末尾被截断，需要确认其后还有内容
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return val
+
+    # 解析整数数组，追加进 out：缓冲区里完整的部分按逗号切开后批量转换，
+    # 最后一个可能被块边界截断的数字留到补读之后再处理
+    def int_array(self, out):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return out
+        while True:
+            end = self.buf.find(']', self.pos)
+            if end >= 0:
+                out.extend(map(int, self.buf[self.pos:end].split(',')))
+                self.pos = end + 1
+                return out
+            cut = self.buf.rfind(',', self.pos)
+            if cut >= 0:
+                out.extend(map(int, self.buf[self.pos:cut].split(',')))
+                self.pos = cut + 1
+            if not self.fill():
+                raise ValueError("unterminated items array")
+
+# 逐个产出实例 {'name', 'capacity', 'items'}；as_numpy=True 时 items 为 numpy int32 数组
+def iter_instances(json_file_path, as_numpy=False, chunk_size=CHUNK_SIZE):
+    with open(json_file_path, 'r') as f:
+        sc = _Scanner(f, chunk_size)
+        sc.expect('[')
+        if sc.peek() == ']':
+            return
+        while True:
+            sc.expect('{')
+            ins = {}
+            if sc.peek() != '}':
+                while True:
+                    key = sc.value()
+                    sc.expect(':')
+                    if key == 'items':
+                        ins[key] = sc.int_array(array('i'))
+                    else:
+                        ins[key] = sc.value()
+                    sep = sc.peek()
+                    sc.pos += 1
+                    if sep == '}':
+                        break
+                    if sep != ',':
+                        raise ValueError(f"expected ',' or '}}' at offset {sc.pos - 1}, got {sep!r}")
+            else:
+                sc.pos += 1
+            if as_numpy and 'items' in ins:
+                import numpy as np
+                ins['items'] = np.frombuffer(ins['items'], dtype=np.int32)
+            yield ins
+            sep = sc.peek()
+            sc.pos += 1
+            if sep == ']':
+                return
+            if sep != ',':
+                raise ValueError(f"expected ',' or ']' at offset {sc.pos - 1}, got {sep!r}")
@@ -0,0 +1,145 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# 运行时插桩：各算法通过具名计数器和计时器上报，按实例汇总成 JSON 报告
+# 三种模式，可用环境变量 BPP_INSTRUMENT 或 set_mode() 在运行时切换：
+#   off      - 默认，count()/add_time() 只做一次布尔判断就返回
+#   counters - 记录计数器与各阶段耗时
+#   profile  - 在 counters 基础上，每个实例再用 cProfile 采样函数耗时、用 tracemalloc 记录峰值内存
+# 热循环里不要逐次调用 count()：先用局部变量累加，循环结束后一次上报
+# 多进程时模式通过环境变量传给子进程，子进程的实例报告随结果返回给父进程（见 parallel_runner）
+
+MODES = ('off', 'counters', 'profile')
+ENV_VAR = 'BPP_INSTRUMENT'
+PROFILE_TOP = 25
+
+_mode = 'off'
+_enabled = False
+_counters = {}
+_timers = {}
+_reports = {}
+
+def set_mode(mode):
+    global _mode, _enabled
+    if mode not in MODES:
+        raise ValueError(f"unknown instrumentation mode: {mode}")
+    _mode = mode
+    _enabled = mode != 'off'
+    os.environ[ENV_VAR] = mode
+
+def mode():
+    return _mode
+
+def enabled():
+    return _enabled
+
+def count(name, n=1):
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+def add_time(name, seconds):
+    if _enabled:
+        _timers[name] = _timers.get(name, 0.0) + seconds
+
+@contextmanager
+def timer(name):
+    if not _enabled:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - t)
+
+# 形如 X.accepted / X.rejected 的计数器对，附带给出接受率
+def _rates(counters):
+    rates = {}
+    for name, accepted in counters.items():
+        if name.endswith('.accepted'):
+            rejected = counters.get(name[:-len('accepted')] + 'rejected', 0)
+            if accepted + rejected:
+                rates[name[:-len('.accepted')] + '.accept_rate'] = accepted / (accepted + rejected)
+    return rates
+
+def _profile_rows(profiler):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({'function': f"{os.path.basename(filename)}:{line}({func})",
+                     'calls': nc, 'tottime': tt, 'cumtime': ct})
+    rows.sort(key=lambda r: -r['cumtime'])
+    return rows[:PROFILE_TOP]
+
+# 包住一个实例的求解：开始时清空计数器，结束时生成该实例的报告并返回（关闭时返回 None）
+# 各脚本的主循环都用它包住每个实例，profile 模式下报告附带该实例的函数耗时与峰值内存
+@contextmanager
+def track_instance(name):
+    if not _enabled:
+        yield None
+        return
+    _counters.clear()
+    _timers.clear()
+    report = {'name': name}
+    profiler = None
+    tracing = False
+    if _mode == 'profile':
+        profiler = cProfile.Profile()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracing = True
+        tracemalloc.reset_peak()
+        profiler.enable()
+    t = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report['wall'] = time.perf_counter() - t
+        if profiler is not None:
+            profiler.disable()
+            report['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+            if tracing:
+                tracemalloc.stop()
+            report['profile'] = _profile_rows(profiler)
+        report['counters'] = dict(_counters)
+        report['timers'] = dict(_timers)
+        report['rates'] = _rates(_counters)
+        add_report(report)
+
+# 收集实例报告；同名实例（例如精确求解阶段和启发式阶段）合并计数与耗时
+def add_report(report):
+    name = report['name']
+    old = _reports.get(name)
+    if old is None:
+        _reports[name] = report
+        return
+    for key in ('counters', 'timers'):
+        for k, v in report[key].items():
+            old[key][k] = old[key].get(k, 0) + v
+    old['rates'] = _rates(old['counters'])
+    old['wall'] += report['wall']
+    if 'profile' in report:
+        old['profile'] = sorted(old.get('profile', []) + report['profile'],
+                                key=lambda r: -r['cumtime'])[:PROFILE_TOP]
+        old['peak_kb'] = max(old.get('peak_kb', 0), report['peak_kb'])
+
+def report_path(solution_path):
+    root, _ = os.path.splitext(solution_path)
+    return root + '.report.json'
+
+# 把所有实例的报告写到解文件旁边（<解文件名>.report.json），关闭时不写，返回写入的路径
+def write_report(solution_path):
+    if not _enabled:
+        return None
+    path = report_path(solution_path)
+    with open(path, 'w') as f:
+        json.dump({'mode': _mode, 'instances': list(_reports.values())}, f, indent=2)
+    return path
+
+set_mode(os.environ.get(ENV_VAR, 'off'))
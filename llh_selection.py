@@ -0,0 +1,161 @@
+import math
+import random
+from collections import deque
+
+# 低层启发式（LLH）选择引擎：按“每 CPU 秒换来的箱子数改进”给各 LLH 记分
+# 每次调用后 update(LLH 序号, 改进箱数, 本次 CPU 秒数)，select() 按所选策略返回下一个 LLH
+# 引擎对象可以跨重启、跨实例复用，积累的记分不会清零
+# 策略：
+#   egreedy - ε-贪心：以 ε 的概率随机探索，否则选累计改进速率最高的
+#   ucb1    - UCB1：归一化改进速率 + 置信上界探索项
+#   choice  - 选择函数（choice function）：单个 LLH 的近期表现 + 紧跟上一个 LLH 时的表现
+#             + 距上次被调用的时间（多样化），前两项按指数衰减记忆
+#   window  - 滑动窗口 UCB：只看最近 window 次调用，适应不同实例 / 搜索阶段表现的变化
+# 从未被调用过的 LLH 总是先被选到；平手时随机选
+
+POLICIES = ('egreedy', 'ucb1', 'choice', 'window')
+
+# CPU 计时分辨率之下的调用按这个时间计，避免除零
+MIN_COST = 1e-6
+
+class Selector:
+    def __init__(self, names):
+        self.names = list(names)
+        k = len(self.names)
+        self.calls = [0] * k
+        self.cpu = [0.0] * k
+        self.gain = [0.0] * k
+
+    def select(self):
+        raise NotImplementedError
+
+    def update(self, idx, improvement, cost):
+        self.calls[idx] += 1
+        self.cpu[idx] += cost
+        self.gain[idx] += improvement
+        self.learn(idx, improvement, max(cost, MIN_COST))
+
+    def learn(self, idx, improvement, cost):
+        pass
+
+    # 累计改进速率（箱子数 / CPU 秒）
+    def rate(self, idx):
+        return self.gain[idx] / max(self.cpu[idx], MIN_COST)
+
+    def untried(self):
+        return [i for i, c in enumerate(self.calls) if not c]
+
+    # 各 LLH 的调用次数、CPU 时间及占比、累计改进和改进速率
+    def report(self):
+        total = sum(self.cpu) or 1.0
+        return [{'llh': name, 'calls': self.calls[i], 'cpu': self.cpu[i], 'share': self.cpu[i] / total,
+                 'gain': self.gain[i], 'rate': self.rate(i)}
+                for i, name in enumerate(self.names)]
+
+    def summary_lines(self):
+        lines = [f"{'LLH':6s} {'calls':>7s} {'CPU(s)':>9s} {'share':>7s} {'gain':>6s} {'bins/s':>9s}"]
+        for r in self.report():
+            lines.append(f"{r['llh']:6s} {r['calls']:7d} {r['cpu']:9.3f} {r['share'] * 100:6.1f}% "
+                         f"{r['gain']:6.0f} {r['rate']:9.2f}")
+        return lines
+
+def _argmax(scores):
+    best = max(scores)
+    return random.choice([i for i, s in enumerate(scores) if s == best])
+
+class EpsilonGreedy(Selector):
+    def __init__(self, names, epsilon=0.15):
+        super().__init__(names)
+        self.epsilon = epsilon
+
+    def select(self):
+        if random.random() < self.epsilon:
+            return random.randrange(len(self.names))
+        return _argmax([self.rate(i) for i in range(len(self.names))])
+
+class UCB1(Selector):
+    def __init__(self, names, c=1.0):
+        super().__init__(names)
+        self.c = c
+
+    def select(self):
+        untried = self.untried()
+        if untried:
+            return random.choice(untried)
+        rates = [self.rate(i) for i in range(len(self.names))]
+        top = max(rates) or 1.0
+        log_n = math.log(sum(self.calls))
+        return _argmax([r / top + self.c * math.sqrt(2 * log_n / n) for r, n in zip(rates, self.calls)])
+
+class ChoiceFunction(Selector):
+    def __init__(self, names, phi=0.5, delta=0.2):
+        super().__init__(names)
+        k = len(self.names)
+        self.phi = phi
+        self.delta = delta
+        self.f1 = [0.0] * k
+        self.f2 = [[0.0] * k for _ in range(k)]
+        self.last_called = [0.0] * k
+        self.clock = 0.0
+        self.prev = None
+        # f1 / f2 按见过的最大单次速率归一化：长期没有改进的 LLH 记忆会衰减到 0，让位给多样化项
+        self.top = 0.0
+
+    def learn(self, idx, improvement, cost):
+        r = improvement / cost
+        self.top = max(self.top, r)
+        self.f1[idx] = r + self.phi * self.f1[idx]
+        if self.prev is not None:
+            self.f2[self.prev][idx] = r + self.phi * self.f2[self.prev][idx]
+        self.clock += cost
+        self.last_called[idx] = self.clock
+        self.prev = idx
+
+    def select(self):
+        untried = self.untried()
+        if untried:
+            return random.choice(untried)
+        k = len(self.names)
+        f2 = self.f2[self.prev] if self.prev is not None else [0.0] * k
+        f3 = [self.clock - t for t in self.last_called]
+        top = self.top or 1.0
+        top3 = max(f3) or 1.0
+        return _argmax([(self.f1[i] + f2[i]) / top + self.delta * f3[i] / top3 for i in range(k)])
+
+class SlidingWindow(Selector):
+    def __init__(self, names, window=50, c=1.0):
+        super().__init__(names)
+        self.c = c
+        self.recent = deque(maxlen=window)
+
+    def learn(self, idx, improvement, cost):
+        self.recent.append((idx, improvement, cost))
+
+    def select(self):
+        k = len(self.names)
+        n = [0] * k
+        gain = [0.0] * k
+        cost = [0.0] * k
+        for i, g, t in self.recent:
+            n[i] += 1
+            gain[i] += g
+            cost[i] += t
+        missing = [i for i in range(k) if not n[i]]
+        if missing:
+            return random.choice(missing)
+        rates = [g / t for g, t in zip(gain, cost)]
+        top = max(rates) or 1.0
+        log_n = math.log(len(self.recent))
+        return _argmax([r / top + self.c * math.sqrt(2 * log_n / m) for r, m in zip(rates, n)])
+
+_POLICY_CLASSES = {
+    'egreedy': EpsilonGreedy,
+    'ucb1': UCB1,
+    'choice': ChoiceFunction,
+    'window': SlidingWindow
+}
+
+def make_selector(policy, names, **params):
+    if policy not in _POLICY_CLASSES:
+        raise ValueError(f"unknown LLH selection policy: {policy}")
+    return _POLICY_CLASSES[policy](names, **params)
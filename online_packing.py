@@ -0,0 +1,94 @@
+import time
+from packing import ResidualIndex
+
+# 在线（流式）装箱：物品逐个到达，只保留打开的箱子，封箱后立即交给调用者
+# 放置策略与离线版本一致：
+#   next_fit  - 只保留一个打开的箱子，放不下就封箱
+#   first_fit - 放入最早打开的能放下的箱子
+#   best_fit  - 放入剩余空间最小的能放下的箱子（平手取最早打开的）
+# max_open 限制同时打开的箱子数（K-bounded）：需要开新箱而已达上限时，
+# best_fit 封掉最满的箱子，first_fit 封掉最早打开的箱子
+POLICIES = ('next_fit', 'first_fit', 'best_fit')
+
+class StreamPacker:
+    def __init__(self, capacity, policy='best_fit', max_open=None):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy: {policy}")
+        if policy == 'next_fit':
+            max_open = 1
+        if max_open is not None and max_open < 1:
+            raise ValueError("max_open must be at least 1")
+        self.capacity = capacity
+        self.policy = policy
+        self.max_open = max_open
+        self.index = ResidualIndex()
+        self.open = {}        # 箱子编号 -> 物品列表
+        self.next_id = 0
+        self.items = 0
+        self.closed = 0
+        self.peak_open = 0
+        self.elapsed = 0.0
+
+    def _pop(self, size):
+        if self.policy == 'best_fit':
+            return self.index.pop_best(size)
+        return self.index.pop_first(size)
+
+    def _close(self, idx):
+        return self.open.pop(idx)
+
+    # 放入一个物品，返回因此封箱的箱子列表（通常为空）
+    def add(self, item):
+        t = time.perf_counter()
+        closed = []
+        idx, residual = self._pop(item)
+        if idx < 0:
+            if self.max_open is not None and len(self.open) >= self.max_open:
+                # 腾出一个位置：pop_best(0) 取最满的箱子，pop_first(0) 取最早打开的箱子
+                victim, _ = self._pop(0)
+                closed.append(self._close(victim))
+            idx = self.next_id
+            self.next_id += 1
+            self.open[idx] = []
+            residual = self.capacity
+        self.open[idx].append(item)
+        residual -= item
+        if residual <= 0:
+            # 已装满的箱子不可能再放东西，直接封箱
+            closed.append(self._close(idx))
+        else:
+            self.index.add(residual, idx)
+        self.items += 1
+        self.closed += len(closed)
+        if len(self.open) > self.peak_open:
+            self.peak_open = len(self.open)
+        self.elapsed += time.perf_counter() - t
+        return closed
+
+    # 流结束：按打开顺序封掉剩余的所有箱子
+    def flush(self):
+        rest = [self.open[idx] for idx in sorted(self.open)]
+        self.open.clear()
+        self.index = ResidualIndex()
+        self.closed += len(rest)
+        return rest
+
+    def stats(self):
+        return {
+            'items': self.items,
+            'bins': self.closed,
+            'open': len(self.open),
+            'peak_open': self.peak_open,
+            'seconds': self.elapsed,
+            'items_per_sec': self.items / self.elapsed if self.elapsed > 0 else 0.0
+        }
+
+# 生成器接口：消费物品迭代器，逐个产出已封箱的箱子（物品列表）
+# stats 为字典时，结束后写入吞吐统计
+def pack_stream(items, capacity, policy='best_fit', max_open=None, stats=None):
+    packer = StreamPacker(capacity, policy, max_open)
+    for item in items:
+        yield from packer.add(item)
+    yield from packer.flush()
+    if stats is not None:
+        stats.update(packer.stats())
@@ -0,0 +1,405 @@
+import heapq
+from bisect import bisect_left, insort
+from instrument import count
+
+# 残余容量有序索引：keys 保存所有非空的残余容量（升序），
+# buckets[r] 是残余容量为 r 的箱子序号最小堆
+class ResidualIndex:
+    __slots__ = ('keys', 'buckets')
+
+    def __init__(self):
+        self.keys = []
+        self.buckets = {}
+
+    def add(self, residual, idx):
+        bucket = self.buckets.get(residual)
+        if bucket is None:
+            self.buckets[residual] = [idx]
+            insort(self.keys, residual)
+        else:
+            heapq.heappush(bucket, idx)
+
+    # 取出残余容量 >= size 的最小残余箱（同残余时取序号最小者），没有则返回 (-1, 0)
+    def pop_best(self, size):
+        keys = self.keys
+        pos = bisect_left(keys, size)
+        if pos == len(keys):
+            return -1, 0
+        residual = keys[pos]
+        bucket = self.buckets[residual]
+        idx = heapq.heappop(bucket)
+        if not bucket:
+            del self.buckets[residual]
+            del keys[pos]
+        return idx, residual
+
+    # 取出残余容量 >= size 的箱子中序号最小（最早打开）的一个，没有则返回 (-1, 0)
+    # 需要比较每个候选残余容量桶的堆顶，代价为 O(不同残余容量个数)
+    def pop_first(self, size):
+        keys = self.keys
+        best_pos, best_idx = -1, -1
+        for pos in range(bisect_left(keys, size), len(keys)):
+            top = self.buckets[keys[pos]][0]
+            if best_idx < 0 or top < best_idx:
+                best_pos, best_idx = pos, top
+        if best_pos < 0:
+            return -1, 0
+        residual = keys[best_pos]
+        bucket = self.buckets[residual]
+        heapq.heappop(bucket)
+        if not bucket:
+            del self.buckets[residual]
+            del keys[best_pos]
+        return best_idx, residual
+
+# 剪枝解码器被当前最好解支配、中途放弃时返回的标记
+DOMINATED = None
+
+# 剪枝解码：incumbent 为当前最好箱子数，一旦能证明本次结果不会少于它就放弃并返回 DOMINATED
+# 下界 = 已确定的箱子数 + 剩余体积（放不进这些箱子剩余空间的部分）至少还要的箱子数，
+# 化简后就是 max(已确定的箱子数, ceil(总体积 / 容量))，后一项开头检查一次即可，
+# 解码中只需在“已确定的箱子数”增加时比较
+# improve=False 时每个打开的箱子都算已确定；improve=True 时之后还要做合并局部搜索，
+# 只有负载超过容量一半的箱子才算（它们两两不能合并，合并后仍各占一个箱子）
+# 返回 (判断阈值 cut, 允许的已确定箱子数上限)：负载从 <= capacity-1-cut 变为 > capacity-1-cut，
+# 即残余容量满足 residual > cut >= residual - item 时，该箱子变为已确定
+def _prune_limits(items, capacity, incumbent, improve):
+    if incumbent is None:
+        return -1, len(items) + 1
+    if -(-sum(items) // capacity) >= incumbent:
+        return -1, 0
+    return ((capacity + 1) // 2 - 1 if improve else capacity - 1), incumbent
+
+# Best Fit 算法：直接按照输入顺序放置，不做排序
+# 每个物品放入“剩余空间最小且能放下”的箱子，平手取最早打开的箱子，
+# 结果与逐箱扫描的写法完全一致，但每次查询只需 O(log bins)
+# incumbent 不为 None 时为剪枝解码（见 _prune_limits），被支配时返回 DOMINATED
+def best_fit(items, capacity, incumbent=None, improve=False):
+    count('decode.best_fit')
+    cut, limit = _prune_limits(items, capacity, incumbent, improve)
+    if not limit:
+        count('decode.dominated')
+        return DOMINATED
+    committed = 0
+    index = ResidualIndex()
+    contents = []
+    for item in items:
+        idx, residual = index.pop_best(item)
+        if idx < 0:
+            idx = len(contents)
+            contents.append([item])
+            residual = capacity
+        else:
+            contents[idx].append(item)
+        if residual > cut >= residual - item:
+            committed += 1
+            if committed >= limit:
+                count('decode.dominated')
+                return DOMINATED
+        index.add(residual - item, idx)
+    return contents
+
+# First Fit 算法：按输入顺序放置，填入第一个（最早打开的）能放下的箱子
+def first_fit(items, capacity, incumbent=None, improve=False):
+    count('decode.first_fit')
+    cut, limit = _prune_limits(items, capacity, incumbent, improve)
+    if not limit:
+        count('decode.dominated')
+        return DOMINATED
+    committed = 0
+    index = ResidualIndex()
+    contents = []
+    for item in items:
+        idx, residual = index.pop_first(item)
+        if idx < 0:
+            idx = len(contents)
+            contents.append([item])
+            residual = capacity
+        else:
+            contents[idx].append(item)
+        if residual > cut >= residual - item:
+            committed += 1
+            if committed >= limit:
+                count('decode.dominated')
+                return DOMINATED
+        index.add(residual - item, idx)
+    return contents
+
+# 一轮合并：把每个箱子当作“物品”按负载从大到小做 Best Fit，
+# 能整体放进已保留箱子的就并进去（选剩余空间最小的），被并掉的位置置 None
+def merge_pass(bins, loads, capacity):
+    order = sorted(range(len(bins)), key=loads.__getitem__, reverse=True)
+    index = ResidualIndex()
+    merged = 0
+    for b in order:
+        keep, residual = index.pop_best(loads[b])
+        if keep < 0:
+            index.add(capacity - loads[b], b)
+            continue
+        bins[keep].extend(bins[b])
+        loads[keep] += loads[b]
+        bins[b] = None
+        index.add(residual - loads[b], keep)
+        merged += 1
+    count('merge.attempted', len(order))
+    count('merge.applied', merged)
+    return merged
+
+# 各位置负载的最小值线段树（叶子数补齐到 2 的幂，空位为 inf），用于找“第一个负载 <= t 的箱子”
+def _min_tree(loads):
+    size = 1
+    while size < len(loads):
+        size *= 2
+    tree = [float('inf')] * (2 * size)
+    tree[size:size + len(loads)] = loads
+    for k in range(size - 1, 0, -1):
+        tree[k] = min(tree[2 * k], tree[2 * k + 1])
+    return tree, size
+
+def _tree_set(tree, size, i, value):
+    k = i + size
+    tree[k] = value
+    k >>= 1
+    while k:
+        tree[k] = min(tree[2 * k], tree[2 * k + 1])
+        k >>= 1
+
+# 下标 >= lo 且负载 <= t 的第一个位置，没有则返回 -1
+def _tree_first(tree, size, lo, t):
+    if lo >= size:
+        return -1
+    k = lo + size
+    # 向右上方找到第一个包含答案的子树
+    while tree[k] > t:
+        while k & 1:
+            k >>= 1
+        if not k:
+            return -1
+        k += 1
+    while k < size:
+        k = 2 * k if tree[2 * k] <= t else 2 * k + 1
+    return k - size
+
+# 逐对 first-improvement 合并（重构前各脚本里的 local_search）的结果：
+# 按箱子顺序找第一个还能并入别的箱子的箱子 i，把顺序上第一个能放进去的箱子并进 i，重复直到没有两个箱子能合并
+# 排在 i 前面的箱子此后也不会再有能并入的箱子（其余箱子只会变少、变重），所以 i 只向后移动，
+# 能并进 i 的箱子也一定排在 i 后面；用线段树找它，整体 O(n log n)
+# 返回合并分组：每组为原箱子下标列表（保留箱在前），组按保留箱的顺序排列
+def first_improvement_groups(loads, capacity):
+    tree, size = _min_tree(loads)
+    groups = []
+    alive = [True] * len(loads)
+    for i, load in enumerate(loads):
+        if not alive[i]:
+            continue
+        group = [i]
+        while True:
+            j = _tree_first(tree, size, i + 1, capacity - load)
+            if j < 0:
+                break
+            load += loads[j]
+            alive[j] = False
+            _tree_set(tree, size, j, float('inf'))
+            group.append(j)
+        groups.append(group)
+    return groups
+
+# 局部搜索：缓存每个箱子的负载，整轮合并所有能合并的箱子
+# 逐对 first-improvement 合并的结果偶尔比整轮 Best Fit 合并更少，先在负载上把两者都算出箱子数，
+# 保留较少的一个，结果不会比 first-improvement 合并差
+# 原地修改 bins（保持剩余箱子的相对顺序）并返回它
+def local_search(bins, capacity, max_iters=100):
+    if len(bins) < 2:
+        return bins
+    loads = [sum(b) for b in bins]
+    # 最轻的两个箱子都合并不了，就不可能再有改进
+    low = heapq.nsmallest(2, loads)
+    if low[0] + low[1] > capacity:
+        return bins
+    groups = first_improvement_groups(loads, capacity)
+    if len(groups) < _best_fit_merged_count(loads, capacity, max_iters):
+        count('merge.first_improvement')
+        merged = []
+        for group in groups:
+            b = bins[group[0]]
+            for j in group[1:]:
+                b.extend(bins[j])
+            merged.append(b)
+        bins[:] = merged
+        return bins
+    for _ in range(max_iters):
+        low = heapq.nsmallest(2, loads)
+        if low[0] + low[1] > capacity:
+            break
+        if not merge_pass(bins, loads, capacity):
+            break
+        alive = [i for i, b in enumerate(bins) if b is not None]
+        bins[:] = [bins[i] for i in alive]
+        loads = [loads[i] for i in alive]
+        if len(bins) < 2:
+            break
+    return bins
+
+# Next Fit 算法：只维护当前打开的箱子，放不下就封箱再开新箱
+def next_fit(items, capacity, incumbent=None, improve=False):
+    count('decode.next_fit')
+    cut, limit = _prune_limits(items, capacity, incumbent, improve)
+    if not limit:
+        count('decode.dominated')
+        return DOMINATED
+    committed = 0
+    contents = []
+    current = []
+    load = 0
+    for item in items:
+        if current and load + item > capacity:
+            contents.append(current)
+            current = []
+            load = 0
+        current.append(item)
+        residual = capacity - load
+        if residual > cut >= residual - item:
+            committed += 1
+            if committed >= limit:
+                count('decode.dominated')
+                return DOMINATED
+        load += item
+    if current:
+        contents.append(current)
+    return contents
+
+# 以下 *_loads 只计算各箱子的负载（用于批量计数），不构造箱子内容
+# 负载按箱子的打开顺序返回：合并局部搜索里的 first-improvement 部分与箱子顺序有关
+# incumbent 的含义与完整解码器相同，被支配时返回 DOMINATED
+def best_fit_loads(items, capacity, incumbent=None, improve=False):
+    cut, limit = _prune_limits(items, capacity, incumbent, improve)
+    if not limit:
+        return DOMINATED
+    committed = 0
+    index = ResidualIndex()
+    loads = []
+    for item in items:
+        idx, residual = index.pop_best(item)
+        if idx < 0:
+            idx = len(loads)
+            loads.append(0)
+            residual = capacity
+        if residual > cut >= residual - item:
+            committed += 1
+            if committed >= limit:
+                return DOMINATED
+        loads[idx] += item
+        index.add(residual - item, idx)
+    return loads
+
+def next_fit_loads(items, capacity, incumbent=None, improve=False):
+    cut, limit = _prune_limits(items, capacity, incumbent, improve)
+    if not limit:
+        return DOMINATED
+    committed = 0
+    loads = []
+    load = 0
+    for item in items:
+        if load and load + item > capacity:
+            loads.append(load)
+            load = 0
+        residual = capacity - load
+        if residual > cut >= residual - item:
+            committed += 1
+            if committed >= limit:
+                return DOMINATED
+        load += item
+    if load:
+        loads.append(load)
+    return loads
+
+LOADS_FUNCS = {
+    best_fit: best_fit_loads,
+    next_fit: next_fit_loads
+}
+# 支持 incumbent 剪枝参数的完整解码器
+PRUNABLE = (best_fit, first_fit, next_fit)
+
+# 在负载上模拟 local_search 的结果，返回合并后的箱子数（与 local_search 结果一致）；loads 按箱子顺序
+def merged_count(loads, capacity, max_iters=100):
+    if len(loads) < 2:
+        return len(loads)
+    low = heapq.nsmallest(2, loads)
+    if low[0] + low[1] > capacity:
+        return len(loads)
+    result = min(len(first_improvement_groups(loads, capacity)), _best_fit_merged_count(loads, capacity, max_iters))
+    count('merge.attempted', len(loads))
+    count('merge.applied', len(loads) - result)
+    return result
+
+# 在负载上模拟整轮 Best Fit 合并（merge_pass），返回合并后的箱子数，与箱子顺序无关
+def _best_fit_merged_count(loads, capacity, max_iters=100):
+    loads = list(loads)
+    for _ in range(max_iters):
+        if len(loads) < 2:
+            break
+        low = heapq.nsmallest(2, loads)
+        if low[0] + low[1] > capacity:
+            break
+        keys = []
+        counts = {}
+        merged = []
+        for load in sorted(loads, reverse=True):
+            pos = bisect_left(keys, load)
+            if pos == len(keys):
+                residual = capacity
+            else:
+                residual = keys[pos]
+                left = counts[residual] - 1
+                if left:
+                    counts[residual] = left
+                else:
+                    del counts[residual]
+                    del keys[pos]
+                merged.append(residual)
+            residual -= load
+            c = counts.get(residual)
+            if c is None:
+                counts[residual] = 1
+                insort(keys, residual)
+            else:
+                counts[residual] = c + 1
+        if not merged:
+            break
+        loads = [capacity - r for r in keys for _ in range(counts[r])]
+    return len(loads)
+
+# 批量评估一组排列：只返回各自的箱子数（improve=True 时为局部搜索之后的箱子数）
+# 已知的解码器走只算负载的快速路径，未知解码器退回完整解码
+# incumbent 不为 None 时做剪枝解码：不可能少于当前最好箱子数（随批内更好的结果一起下降）的排列
+# 记为 DOMINATED，不影响“第一个严格更优的排列”是谁
+def batch_counts(perms, capacity, fit_fun=best_fit, improve=False, incumbent=None):
+    loads_fun = LOADS_FUNCS.get(fit_fun)
+    prunable = fit_fun in PRUNABLE
+    if loads_fun is not None:
+        count('decode.' + loads_fun.__name__, len(perms))
+    counts = []
+    dominated = 0
+    for perm in perms:
+        if loads_fun is None:
+            sol = fit_fun(perm, capacity, incumbent, improve) if prunable else fit_fun(perm, capacity)
+            if sol is DOMINATED:
+                cnt = DOMINATED
+            else:
+                if improve:
+                    sol = local_search(sol, capacity)
+                cnt = len(sol)
+        else:
+            loads = loads_fun(perm, capacity, incumbent, improve)
+            if loads is DOMINATED:
+                cnt = DOMINATED
+            else:
+                cnt = merged_count(loads, capacity) if improve else len(loads)
+        counts.append(cnt)
+        if cnt is DOMINATED:
+            dominated += 1
+        elif incumbent is not None and cnt < incumbent:
+            incumbent = cnt
+    if loads_fun is not None:
+        count('decode.dominated', dominated)
+    return counts
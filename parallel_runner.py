@@ -0,0 +1,53 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from instrument import add_report, track_instance
+
+# 单个实例任务：用该实例自己的种子重置本进程的 random，
+# 这样结果只取决于 (seed, 实例序号)，与分到哪个进程、进程里先跑了什么无关
+# 插桩打开时（模式经环境变量传给子进程）顺带返回该实例的报告，插桩关闭时为 None
+def _run_one(solve_fn, ins, seed, args=()):
+    random.seed(seed)
+    wall0 = time.time()
+    cpu0 = time.process_time()
+    with track_instance(ins['name']) as report:
+        result = solve_fn(ins, *args)
+    return result, time.time() - wall0, time.process_time() - cpu0, report
+
+# 把单个实例任务提交到已有的进程池（常驻服务复用同一个进程池），
+# future 的结果为 (结果, 墙钟时间, CPU 时间, 插桩报告或 None)
+def submit_instance(pool, solve_fn, ins, seed, args=()):
+    return pool.submit(_run_one, solve_fn, ins, seed, args)
+
+# 多进程并行求解所有实例，按原实例顺序逐个产出 (结果, 墙钟时间, CPU 时间)，
+# 某个实例一完成（且它前面的实例都已完成）就立即交出，便于调用方边算边写结果
+# solve_fn 必须是模块顶层函数（需要能被 pickle 传给子进程）
+# task_args 可为每个实例额外提供一组位置参数：solve_fn(ins, *task_args[k])
+# 第 k 个实例的种子为 seed + k；只求解部分实例时用 seeds 直接给出各实例的种子（如 seed + 原实例序号），
+# 同一个实例的种子就不会因为前面有实例被跳过而改变
+def iter_results(solve_fn, instances, seed=0, workers=None, task_args=None, seeds=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(instances)))
+    if seeds is None:
+        seeds = [seed + k for k in range(len(instances))]
+    if task_args is None:
+        task_args = [()] * len(instances)
+    tasks = list(zip(instances, seeds, task_args))
+    if workers == 1:
+        # 同一进程内 track_instance 已经登记了报告
+        for ins, s, a in tasks:
+            yield _run_one(solve_fn, ins, s, a)[:3]
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [submit_instance(pool, solve_fn, ins, s, a) for ins, s, a in tasks]
+        for f in futures:
+            *result, report = f.result()
+            if report is not None:
+                add_report(report)
+            yield tuple(result)
+
+# 同 iter_results，但一次性返回 [(结果, 墙钟时间, CPU 时间), ...]
+def run_instances(solve_fn, instances, seed=0, workers=None, task_args=None, seeds=None):
+    return list(iter_results(solve_fn, instances, seed, workers, task_args, seeds))
@@ -0,0 +1,148 @@
+import heapq
+import random
+
+# 扰动型低层启发式：直接在共享的 BinState 上原地修改当前解，每次调用只尝试一步，
+# 代价为 O(1)（移动、交换）到 O(箱子数 × 箱内物品数)（清空箱子、毁坏重建），不再整解重建
+# 每个函数返回 (箱子数变化量, Σ load² 的变化量)；不满足接受准则时不修改解（或自行撤销），返回 (0, 0)
+# 接受准则：箱子数减少，或箱子数不变且 Σ load² 不减少（负载更集中，更接近腾空某个箱子）
+# 箱子数只减不增，当前解始终就是最好解
+
+# 箱子 a 的负载增加 d、箱子 b 的负载减少 d 时 Σ load² 的变化量
+def _sq_delta(load_a, load_b, d):
+    return 2 * d * (load_a - load_b + d)
+
+# Best Fit：能放下 item 的最满的非空箱子（跳过 skip），没有时返回 None
+def _best_fit_bin(state, item, skip=-1):
+    loads = state.loads
+    room = state.capacity - item
+    best, best_load = None, -1
+    for j in state.alive:
+        load = loads[j]
+        if best_load < load <= room and j != skip:
+            best, best_load = j, load
+    return best
+
+# 移动：随机物品移到另一个随机箱子
+def shift(state):
+    if state.count() < 2:
+        return 0, 0
+    contents, loads = state.contents, state.loads
+    i = state.random_bin()
+    j = state.random_bin(exclude=i)
+    p = random.randrange(len(contents[i]))
+    item = contents[i][p]
+    if loads[j] + item > state.capacity:
+        return 0, 0
+    gain = _sq_delta(loads[j], loads[i], item)
+    # 源箱子只剩这一个物品时移走它就少一个箱子，总是接受
+    if gain < 0 and len(contents[i]) > 1:
+        return 0, 0
+    return state.move(i, p, j), gain
+
+# 1-1 交换：两个随机箱子各取一个物品互换
+def swap_11(state):
+    if state.count() < 2:
+        return 0, 0
+    contents, loads, capacity = state.contents, state.loads, state.capacity
+    i = state.random_bin()
+    j = state.random_bin(exclude=i)
+    p = random.randrange(len(contents[i]))
+    q = random.randrange(len(contents[j]))
+    d = contents[j][q] - contents[i][p]
+    if not d or loads[i] + d > capacity or loads[j] - d > capacity:
+        return 0, 0
+    gain = _sq_delta(loads[i], loads[j], d)
+    if gain < 0:
+        return 0, 0
+    state.swap(i, p, j, q)
+    return 0, gain
+
+# 2-1 交换：箱子 i 的两个物品与箱子 j 的一个物品互换
+def swap_21(state):
+    if state.count() < 2:
+        return 0, 0
+    contents, loads, capacity = state.contents, state.loads, state.capacity
+    i = state.random_bin()
+    n = len(contents[i])
+    if n < 2:
+        return 0, 0
+    j = state.random_bin(exclude=i)
+    p1 = random.randrange(n)
+    p2 = random.randrange(n - 1)
+    if p2 >= p1:
+        p2 += 1
+    q = random.randrange(len(contents[j]))
+    d = contents[j][q] - contents[i][p1] - contents[i][p2]
+    if loads[i] + d > capacity or loads[j] - d > capacity:
+        return 0, 0
+    gain = _sq_delta(loads[i], loads[j], d)
+    if gain < 0:
+        return 0, 0
+    # 先交换 p1 与 q，再把 p2 移到 j；箱子 i 至少还剩换进来的物品，不会被清空
+    state.swap(i, p1, j, q)
+    state.move(i, p2, j)
+    return 0, gain
+
+# 清空箱子：两个随机箱子中较空的那个，把物品逐个 Best Fit 到其他箱子；有物品放不下就全部撤销
+def empty_bin(state):
+    if state.count() < 2:
+        return 0, 0
+    contents, loads = state.contents, state.loads
+    a = state.random_bin()
+    b = state.random_bin(exclude=a)
+    i = a if loads[a] <= loads[b] else b
+    src = contents[i]
+    moved = []
+    gain = 0
+    while src:
+        p = len(src) - 1
+        item = src[p]
+        j = _best_fit_bin(state, item, skip=i)
+        if j is None:
+            for p, j in reversed(moved):
+                state.undo_move(i, p, j)
+            return 0, 0
+        gain += _sq_delta(loads[j], loads[i], item)
+        state.move(i, p, j)
+        moved.append((p, j))
+    return -1, gain
+
+# 毁坏重建：取出最空的 k 个箱子里的全部物品，按尺寸递减 Best Fit 放回，放不下时重新启用腾空的箱子；
+# 结果不满足接受准则时按相反顺序撤销，并删掉期间新建的箱子（只有腾空的箱子都用完才会新建，
+# 此时箱子数必然增加、一定被撤销，所以反复尝试不会让 BinState 里堆积空箱子）
+def ruin_recreate(state, k=3):
+    alive = state.alive
+    if len(alive) <= k:
+        return 0, 0
+    contents, loads = state.contents, state.loads
+    before = state.count()
+    top = len(contents)
+    ruined = heapq.nsmallest(k, alive, key=loads.__getitem__)
+    gain = 0
+    removed = []
+    for b in ruined:
+        gain -= loads[b] * loads[b]
+        while contents[b]:
+            item, _ = state.pop(b)
+            removed.append((b, item))
+    spare = ruined[::-1]
+    added = []
+    for item in sorted((item for _, item in removed), reverse=True):
+        j = _best_fit_bin(state, item)
+        if j is None:
+            j = spare.pop() if spare else state.new_bin()
+        gain += item * (2 * loads[j] + item)
+        state.add(j, item)
+        added.append(j)
+    delta = state.count() - before
+    if delta < 0 or (delta == 0 and gain >= 0):
+        return delta, gain
+    for j in reversed(added):
+        state.pop(j)
+    for b, item in reversed(removed):
+        state.add(b, item)
+    state.truncate(top)
+    return 0, 0
+
+PERTURBATIVE = [shift, swap_11, swap_21, empty_bin, ruin_recreate]
+PERTURBATIVE_NAMES = ['shift', 'swap11', 'swap21', 'empty', 'ruin']
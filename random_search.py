@@ -0,0 +1,45 @@
+import random
+import time
+from packing import DOMINATED, batch_counts, local_search
+
+# 随机搜索：反复打乱物品顺序并解码，保留箱子数最少的排列
+# 每 batch_size 个排列为一块批量计数（不构造箱子内容），只有最终胜出的排列才真正解码出解
+# improve=True 时在解码后做合并局部搜索；time_limit 为 None 表示不限时
+# 箱子数达到 lower_bound（已证明最优）时立即停止
+# cache 为 EvalCache 时，尺寸序列已经评估过的排列直接取缓存的箱子数
+# 解码时带上当前最好箱子数做剪枝：中途就能确定不会更好的排列提前放弃（结果与不剪枝时相同）
+def random_search_fit(items, capacity, fit_fun, iterations=1000, time_limit=None,
+                      improve=False, batch_size=50, lower_bound=0, cache=None):
+    tag = (fit_fun.__name__, improve)
+    best_perm = None
+    min_bins = float('inf')
+    start_search = time.time()
+    done = 0
+    while done < iterations and min_bins > lower_bound:
+        if time_limit is not None and time.time() - start_search > time_limit:
+            print(f"[Warning] 搜索超过 {time_limit}s，提前退出随机搜索。")
+            break
+        perms = []
+        for _ in range(min(batch_size, iterations - done)):
+            tmp_items = list(items)
+            random.shuffle(tmp_items)
+            perms.append(tmp_items)
+        done += len(perms)
+        incumbent = None if best_perm is None else min_bins
+        if cache is None:
+            counts = batch_counts(perms, capacity, fit_fun, improve, incumbent)
+        else:
+            counts = cache.lookup_counts(perms, capacity, tag,
+                                         lambda todo: batch_counts(todo, capacity, fit_fun, improve, incumbent))
+        for perm, cnt in zip(perms, counts):
+            if cnt is not DOMINATED and cnt < min_bins:
+                min_bins = cnt
+                best_perm = perm
+                if min_bins <= lower_bound:
+                    break
+    if best_perm is None:
+        return None
+    best_solution = fit_fun(best_perm, capacity)
+    if improve:
+        best_solution = local_search(best_solution, capacity)
+    return best_solution
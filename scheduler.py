@@ -0,0 +1,93 @@
+import json
+import math
+import os
+import time
+from packing import best_fit_loads
+from histogram import Histogram, use_histogram, pattern_best_fit, bin_count
+
+# 全局时间预算调度：
+# 1. 按实例规模和“估计解 - 下界”的差距把总预算分给各实例；
+# 2. 实例内部按比例把时间片分给各阶段，前面阶段没用完的时间顺延给后面的阶段；
+# 3. 记录各阶段在相似实例上的改进速率，一直没有改进的阶段直接跳过
+
+STAGES = ['Base', 'Annealed', 'Tabu', 'VNS']
+STAGE_SHARES = {'Base': 0.3, 'Annealed': 0.2, 'Tabu': 0.25, 'VNS': 0.25}
+
+# 相似实例：物品数在同一个 2 的幂区间内
+def size_class(ins):
+    return f"n{2 ** int(math.log2(max(1, len(ins['items']))))}"
+
+# 各阶段的历史改进记录：{size_class: {stage: [总改进箱数, 总耗时, 样本数]}}，可存成 JSON 供下次运行使用
+class StageHistory:
+    def __init__(self, path=None, min_samples=3):
+        self.path = path
+        self.min_samples = min_samples
+        self.data = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.data = json.load(f)
+
+    def record(self, key, stage, improvement, seconds):
+        entry = self.data.setdefault(key, {}).setdefault(stage, [0, 0.0, 0])
+        entry[0] += improvement
+        entry[1] += seconds
+        entry[2] += 1
+
+    # 每秒改进的箱子数；没有记录时返回 None
+    def rate(self, key, stage):
+        entry = self.data.get(key, {}).get(stage)
+        if not entry or entry[1] <= 0:
+            return None
+        return entry[0] / entry[1]
+
+    # 样本足够且从未改进过的阶段跳过（Base 负责产生初始解，不能跳过）
+    def should_skip(self, key, stage):
+        if stage == 'Base':
+            return False
+        entry = self.data.get(key, {}).get(stage)
+        return entry is not None and entry[2] >= self.min_samples and entry[0] == 0
+
+    def skipped(self, key):
+        return [s for s in STAGES if self.should_skip(key, s)]
+
+    def save(self):
+        if self.path:
+            with open(self.path, 'w') as f:
+                json.dump(self.data, f, indent=2)
+
+# 把总预算（秒）分给各实例：权重 = 物品数 * (1 + 估计差距)，估计解取 Best Fit Decreasing
+# 多进程时总 CPU 预算按并行度放大，但单个实例的时间片不超过墙钟预算
+def allocate(instances, budget, lbs, workers=1):
+    weights = []
+    for ins, lb in zip(instances, lbs):
+        if use_histogram(ins['items']):
+            hist = Histogram(ins['items'])
+            est = bin_count(pattern_best_fit(hist.decreasing(), hist.sizes, ins['capacity']))
+        else:
+            est = len(best_fit_loads(sorted(ins['items'], reverse=True), ins['capacity']))
+        weights.append(len(ins['items']) * (1 + max(0, est - lb)))
+    total = sum(weights) or 1
+    cpu_budget = budget * max(1, min(workers, len(instances)))
+    return [min(budget, cpu_budget * w / total) for w in weights]
+
+# 实例内的阶段计划：每个阶段拿到 剩余时间 * 本阶段占比 / 未运行阶段占比之和，
+# 并且不会超过全局截止时间 deadline（time.time() 的绝对时间）
+class StagePlan:
+    def __init__(self, slice_seconds, deadline=None, skip=()):
+        self.remaining = slice_seconds
+        self.deadline = deadline
+        self.pending = [s for s in STAGES if s not in skip]
+        self.skip = set(skip)
+
+    def budget(self, stage):
+        if stage not in self.pending:
+            return 0.0
+        share = STAGE_SHARES[stage] / sum(STAGE_SHARES[s] for s in self.pending)
+        self.pending.remove(stage)
+        seconds = max(0.0, self.remaining * share)
+        if self.deadline is not None:
+            seconds = min(seconds, max(0.0, self.deadline - time.time()))
+        return seconds
+
+    def spent(self, seconds):
+        self.remaining -= seconds
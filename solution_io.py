@@ -0,0 +1,238 @@
+import json
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime
+
+# 解的流式写出与读取，支持三种格式：
+#   json    - 原有格式 {"date", "res": [{"name", "capacity", "solution"}], "time"}，
+#             每解完一个实例就写入一行并 flush，"time" 在全部结束时写入
+#   compact - JSON Lines：首行为文件头，之后每行一个实例 {"name", "capacity", "bins"}，
+#             bins[k] 为实例中第 k 个物品所在的箱子编号，最后一行为 {"time"}
+#   binary  - 二进制版的 compact 编码，箱子编号按需用 1/2/4 字节存储（小端序）
+# 运行被中断时，已写出的实例仍可被 read_solution 读出（此时没有 "time"）
+
+FORMATS = ('json', 'compact', 'binary')
+BINARY_MAGIC = b'BPS1'
+_ID_TYPES = ((0xFF, 'B', 1), (0xFFFF, 'H', 2), (0xFFFFFFFF, 'I', 4))
+
+# 把 list-of-lists 形式的解编码为 “物品下标 -> 箱子编号”
+# 同尺寸的物品可以互换，按出现顺序依次分配下标
+def encode_assignment(items, solution):
+    slots = {}
+    for k in range(len(items) - 1, -1, -1):
+        slots.setdefault(items[k], []).append(k)
+    bins = [-1] * len(items)
+    for b, content in enumerate(solution):
+        for size in content:
+            stack = slots.get(size)
+            if not stack:
+                raise ValueError(f"item of size {size} does not belong to the instance")
+            bins[stack.pop()] = b
+    if any(b < 0 for b in bins):
+        raise ValueError("solution does not contain every item of the instance")
+    return bins
+
+def decode_assignment(items, bins):
+    solution = [[] for _ in range(max(bins) + 1 if len(bins) else 0)]
+    for size, b in zip(items, bins):
+        solution[b].append(size)
+    return solution
+
+# 取出某个结果记录对应的 list-of-lists 解（compact/binary 记录需要实例的物品列表）
+def decode_solution(ins, res):
+    if 'solution' in res:
+        return res['solution']
+    if len(res['bins']) != len(ins['items']):
+        raise ValueError(f"assignment length does not match instance {ins['name']}")
+    return decode_assignment(ins['items'], res['bins'])
+
+# 解对应的物品下标顺序：按箱子依次排列（用于把已有的解放进 GA 种群 / PSO 粒子群）
+def solution_order(items, solution):
+    bins = encode_assignment(items, solution)
+    return sorted(range(len(items)), key=bins.__getitem__)
+
+class SolutionWriter:
+    def __init__(self, path, fmt='json', date=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown solution format: {fmt}")
+        self.fmt = fmt
+        self.date = date or datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+        self.count = 0
+        self.closed = False
+        self.start = time.time()
+        if fmt == 'binary':
+            self.f = open(path, 'wb')
+            date_bytes = self.date.encode('utf-8')
+            self.f.write(BINARY_MAGIC + struct.pack('<I', len(date_bytes)) + date_bytes)
+        else:
+            self.f = open(path, 'w')
+            if fmt == 'json':
+                self.f.write('{\n    "date": ' + json.dumps(self.date) + ',\n    "res": [\n')
+            else:
+                self.f.write(json.dumps({'format': 'compact', 'date': self.date}) + '\n')
+        self.f.flush()
+
+    # 写入一个实例的解并立即落盘
+    def write(self, ins, solution):
+        if self.fmt == 'json':
+            res = {'name': ins['name'], 'capacity': ins['capacity'], 'solution': solution}
+            self.f.write((',\n' if self.count else '') + '        ' + json.dumps(res))
+        else:
+            bins = encode_assignment(ins['items'], solution)
+            if self.fmt == 'compact':
+                res = {'name': ins['name'], 'capacity': ins['capacity'], 'bins': bins}
+                self.f.write(json.dumps(res, separators=(',', ':')) + '\n')
+            else:
+                top = max(bins) if bins else 0
+                code, width = next((c, w) for limit, c, w in _ID_TYPES if top <= limit)
+                ids = array(code, bins)
+                if sys.byteorder == 'big':
+                    ids.byteswap()
+                name = ins['name'].encode('utf-8')
+                self.f.write(b'R' + struct.pack('<H', len(name)) + name
+                             + struct.pack('<iIB', ins['capacity'], len(bins), width) + ids.tobytes())
+        self.count += 1
+        self.f.flush()
+
+    # 写入总耗时并关闭文件
+    def close(self, total_time):
+        if self.closed:
+            return
+        if self.fmt == 'json':
+            self.f.write('\n    ],\n    "time": ' + json.dumps(total_time) + '\n}\n')
+        elif self.fmt == 'compact':
+            self.f.write(json.dumps({'time': total_time}) + '\n')
+        else:
+            self.f.write(b'T' + struct.pack('<d', total_time))
+        self.f.close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    # 正常退出时若还没 close()，以创建 writer 以来的耗时作为总耗时收尾；
+    # 异常退出时不写 time，只关闭文件，保留已写出的实例
+    def __exit__(self, exc_type, exc, tb):
+        if self.closed:
+            return
+        if exc_type is None:
+            self.close(time.time() - self.start)
+        else:
+            self.f.close()
+            self.closed = True
+
+def _read_binary(data):
+    pos = len(BINARY_MAGIC)
+    (n,) = struct.unpack_from('<I', data, pos)
+    pos += 4
+    out = {'date': data[pos:pos + n].decode('utf-8'), 'res': []}
+    pos += n
+    codes = {w: c for _, c, w in _ID_TYPES}
+    while pos < len(data):
+        tag = data[pos:pos + 1]
+        pos += 1
+        if tag == b'T':
+            if pos + 8 > len(data):
+                break
+            (out['time'],) = struct.unpack_from('<d', data, pos)
+            pos += 8
+        elif tag == b'R':
+            try:
+                (n,) = struct.unpack_from('<H', data, pos)
+                name = data[pos + 2:pos + 2 + n].decode('utf-8')
+                pos += 2 + n
+                capacity, count, width = struct.unpack_from('<iIB', data, pos)
+                pos += 9
+            except struct.error:
+                break
+            if pos + count * width > len(data):
+                break
+            ids = array(codes[width])
+            ids.frombytes(data[pos:pos + count * width])
+            if sys.byteorder == 'big':
+                ids.byteswap()
+            pos += count * width
+            out['res'].append({'name': name, 'capacity': capacity, 'bins': ids.tolist()})
+        else:
+            raise ValueError(f"corrupt binary solution file at offset {pos - 1}")
+    return out
+
+def _read_compact(text):
+    lines = text.splitlines()
+    out = {'date': json.loads(lines[0]).get('date'), 'res': []}
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            break  # 被中断时最后一行可能不完整
+        if 'time' in rec and 'name' not in rec:
+            out['time'] = rec['time']
+        else:
+            out['res'].append(rec)
+    return out
+
+# 原有 JSON 格式；文件不完整（运行被中断）时尽量读出已写完的实例
+def _read_json(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    decoder = json.JSONDecoder()
+    out = {'res': []}
+    start = text.find('"res"')
+    if start < 0:
+        raise ValueError("not a solution file")
+    pos = text.find('[', start) + 1
+    while pos > 0:
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        try:
+            res, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        out['res'].append(res)
+    return out
+
+# 读取任意格式的解文件，返回 {'date', 'time'(可能缺失), 'res': [...]}
+# res 中的记录含 'solution'（json）或 'bins'（compact/binary），用 decode_solution 得到箱子列表
+def read_solution(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data.startswith(BINARY_MAGIC):
+        return _read_binary(data)
+    text = data.decode('utf-8')
+    first = text.split('\n', 1)[0]
+    try:
+        header = json.loads(first)
+    except json.JSONDecodeError:
+        header = None
+    if isinstance(header, dict) and header.get('format') == 'compact':
+        return _read_compact(text)
+    return _read_json(text)
+
+# 热启动：读入之前的解文件（任意格式），按实例名取出可作为初始解的装箱方案
+# 构造时就读完整个文件，所以可以是本次运行要覆盖写出的同一个解文件
+# 没有该实例的记录、容量不符、物品对不上或超出容量时返回 None
+class WarmStart:
+    def __init__(self, path):
+        self.records = {res['name']: res for res in read_solution(path)['res'] if 'name' in res}
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, ins):
+        res = self.records.get(ins['name'])
+        if res is None or res.get('capacity', ins['capacity']) != ins['capacity']:
+            return None
+        try:
+            solution = [list(b) for b in decode_solution(ins, res) if len(b)]
+            encode_assignment(ins['items'], solution)
+        except (ValueError, IndexError, TypeError):
+            return None
+        if any(sum(b) > ins['capacity'] for b in solution):
+            return None
+        return solution
@@ -0,0 +1,353 @@
+import argparse
+import json
+import math
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from packing import best_fit, next_fit
+from random_search import random_search_fit
+from annealing import simulated_annealing
+from bounds import lower_bound
+from exact import exact_solve
+from instance_io import iter_instances
+from parallel_runner import submit_instance
+from solution_io import SolutionWriter
+import SA_2
+import GA
+import PSO
+import LLH
+
+# 常驻求解服务：启动时建好并预热进程池、导入全部算法模块，之后反复接收求解请求，
+# 调优或批量评分时不必每次都付出解释器启动、模块导入和读实例文件的开销
+# 通过 stdin/stdout（默认）或 Unix socket（--socket）通信，协议为 JSON Lines，一行一个请求：
+#   {"id": 任意, "algorithm": "SA_2", "deadline": 秒数, "seed": 0, "instances": [实例, ...]}
+#   实例沿用 CW_ins.json 的格式 {"name", "capacity", "num_items", "items"}，也可用 "instance" 只给一个
+#   {"id": ..., "op": "ping" | "algorithms" | "shutdown"}
+# 每个实例求解完成就立即回一行（按完成顺序，不按提交顺序）：
+#   {"id", "name", "algorithm", "bins", "lower_bound", "solution", "time", "cpu"}，出错时为 {"id", "name", "error"}
+# 请求的全部实例完成后回 {"id", "done": true, "solved", "failed"}
+# deadline 从服务收到请求时开始计算，排队等待的时间也算在内；各算法只在迭代之间检查时间，
+# 所以是尽力而为的软时限。算法打印的进度信息被重定向到 stderr，不会混进协议输出
+
+DEFAULT_DEADLINE = 30
+
+# 各算法在给定秒数内求解，参数与对应脚本 __main__ 中保持一致，只把时限换成请求的时限
+def _solve_next_fit(ins, lb, seconds):
+    return random_search_fit(ins['items'], ins['capacity'], next_fit, time_limit=seconds, lower_bound=lb)
+
+def _solve_bext_fit(ins, lb, seconds):
+    return random_search_fit(ins['items'], ins['capacity'], best_fit, time_limit=seconds, lower_bound=lb)
+
+def _solve_first_descent(ins, lb, seconds):
+    return random_search_fit(ins['items'], ins['capacity'], best_fit, iterations=1000,
+                             time_limit=seconds, improve=True, lower_bound=lb)
+
+# 随机搜索用一半时间，退火用剩下的时间
+def _solve_sa(ins, lb, seconds):
+    t = time.time()
+    base = random_search_fit(ins['items'], ins['capacity'], best_fit, iterations=1000,
+                             time_limit=seconds / 2, improve=True, lower_bound=lb)
+    annealed = simulated_annealing(base, ins['capacity'], init_temp=1000.0, lower_bound=lb,
+                                   time_limit=max(0.0, seconds - (time.time() - t)))
+    return annealed if len(annealed) < len(base) else base
+
+def _solve_sa_2(ins, lb, seconds):
+    solution, _, _ = SA_2.solve_instance(ins, seconds, time.time() + seconds, lb=lb)
+    return solution
+
+def _solve_ga(ins, lb, seconds):
+    return GA.genetic_fit(ins['items'], ins['capacity'], pop_size=100, generations=1000,
+                          crossover_rate=0.8, mutation_rate=0.1, time_limit=seconds, lower_bound=lb)
+
+def _solve_pso(ins, lb, seconds):
+    return PSO.pso_search(ins['items'], ins['capacity'], num_particles=50, iterations=500,
+                          w=1.0, c1=1.5, c2=1.5, vmax=1.0, time_limit=seconds, lower_bound=lb)
+
+# 构造阶段用完剩下的时间（最多 PERTURB_TIME_LIMIT 秒）给扰动阶段
+def _solve_llh(ins, lb, seconds):
+    t = time.time()
+    solution = LLH.hyper_heuristic_search(ins['items'], ins['capacity'], epsilon=0.15, max_restarts=100,
+                                          lower_bound=lb, time_limit=seconds)
+    if len(solution) <= lb:
+        return solution
+    left = min(LLH.PERTURB_TIME_LIMIT, seconds - (time.time() - t))
+    return LLH.perturbative_search(solution, ins['capacity'], lower_bound=lb, time_limit=max(0.0, left))
+
+def _solve_exact(ins, lb, seconds):
+    solution, _ = exact_solve(ins['items'], ins['capacity'], time_limit=seconds, lower_bound=lb)
+    return solution
+
+ALGORITHMS = {
+    'next_fit': _solve_next_fit,
+    'bext_fit': _solve_bext_fit,
+    'first_descent': _solve_first_descent,
+    'SA': _solve_sa,
+    'SA_2': _solve_sa_2,
+    'GA': _solve_ga,
+    'PSO': _solve_pso,
+    'LLH': _solve_llh,
+    'exact': _solve_exact
+}
+
+# 子进程里执行：deadline 为绝对时间（time.time()），返回 (解, 下界)
+def solve_request(ins, algorithm, deadline):
+    seconds = deadline - time.time()
+    if seconds <= 0:
+        raise TimeoutError("deadline passed before the instance was started")
+    lb = lower_bound(ins['items'], ins['capacity'])
+    return ALGORITHMS[algorithm](ins, lb, seconds), lb
+
+def _is_int(x):
+    return isinstance(x, int) and not isinstance(x, bool)
+
+def _is_number(x):
+    return (_is_int(x) or isinstance(x, float)) and math.isfinite(x)
+
+# 校验求解请求，返回 (算法, 实例列表, 时限秒数, 种子)；不合法时抛出 ValueError，说明哪里不对
+def _parse_solve(req):
+    algorithm = req.get('algorithm')
+    if not isinstance(algorithm, str) or algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown algorithm: {algorithm}")
+    instances = req.get('instances')
+    if instances is None:
+        instances = [req['instance']] if 'instance' in req else []
+    if not isinstance(instances, list):
+        raise ValueError("instances must be a list")
+    for k, ins in enumerate(instances):
+        if not isinstance(ins, dict):
+            raise ValueError(f"instance {k} must be a JSON object")
+        if not isinstance(ins.get('name'), str):
+            raise ValueError(f"instance {k}: name must be a string")
+        if not _is_int(ins.get('capacity')) or ins['capacity'] <= 0:
+            raise ValueError(f"instance {k}: capacity must be a positive integer")
+        items = ins.get('items')
+        if not isinstance(items, list) or not all(_is_int(x) and x > 0 for x in items):
+            raise ValueError(f"instance {k}: items must be a list of positive integers")
+    seconds = req.get('deadline', DEFAULT_DEADLINE)
+    if not _is_number(seconds):
+        raise ValueError(f"deadline must be a number of seconds, got {seconds!r}")
+    seed = req.get('seed', 0)
+    if not _is_int(seed):
+        raise ValueError(f"seed must be an integer, got {seed!r}")
+    return algorithm, instances, float(seconds), seed
+
+def _init_worker():
+    sys.stdout = sys.stderr
+
+def _warm(_):
+    return os.getpid()
+
+class SolverService:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # 预热：让每个工作进程都先启动起来，第一个请求不必等进程创建
+        list(self.pool.map(_warm, range(self.workers)))
+        self.stopped = threading.Event()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    # 处理一行请求；emit(dict) 用于回写（可能在其他线程中调用），返回本请求所有实例的 future
+    # 格式不对的请求只回一条 {"id", "error"}，不影响服务继续处理后面的请求
+    def handle(self, line, emit):
+        try:
+            req = json.loads(line)
+        except json.JSONDecodeError as e:
+            emit({'id': None, 'error': f"invalid JSON: {e}"})
+            return []
+        if not isinstance(req, dict):
+            emit({'id': None, 'error': "request must be a JSON object"})
+            return []
+        rid = req.get('id')
+        op = req.get('op', 'solve')
+        if op == 'ping':
+            emit({'id': rid, 'ok': True, 'workers': self.workers})
+            return []
+        if op == 'algorithms':
+            emit({'id': rid, 'algorithms': list(ALGORITHMS)})
+            return []
+        if op == 'shutdown':
+            emit({'id': rid, 'ok': True})
+            self.stopped.set()
+            return []
+        if op != 'solve':
+            emit({'id': rid, 'error': f"unknown op: {op}"})
+            return []
+        try:
+            algorithm, instances, seconds, seed = _parse_solve(req)
+        except ValueError as e:
+            emit({'id': rid, 'error': str(e)})
+            return []
+        if not instances:
+            emit({'id': rid, 'done': True, 'solved': 0, 'failed': 0})
+            return []
+        deadline = time.time() + seconds
+
+        lock = threading.Lock()
+        tally = {'left': len(instances), 'solved': 0, 'failed': 0}
+
+        def finished(future, ins):
+            name = ins.get('name')
+            try:
+                (solution, lb), wall, cpu, report = future.result()
+            except Exception as e:
+                msg = {'id': rid, 'name': name, 'error': f"{type(e).__name__}: {e}"}
+                ok = False
+            else:
+                msg = {'id': rid, 'name': name, 'algorithm': algorithm, 'bins': len(solution),
+                       'lower_bound': lb, 'solution': solution, 'time': wall, 'cpu': cpu}
+                if report is not None:
+                    msg['report'] = report
+                ok = True
+            emit(msg)
+            with lock:
+                tally['solved' if ok else 'failed'] += 1
+                tally['left'] -= 1
+                last = not tally['left']
+            if last:
+                emit({'id': rid, 'done': True, 'solved': tally['solved'], 'failed': tally['failed']})
+
+        futures = []
+        for k, ins in enumerate(instances):
+            f = submit_instance(self.pool, solve_request, ins, seed + k, (algorithm, deadline))
+            f.add_done_callback(lambda f, ins=ins: finished(f, ins))
+            futures.append(f)
+        return futures
+
+# 回写一行 JSON；多个实例的回调可能同时完成，用锁保证每行完整
+def _line_writer(stream):
+    lock = threading.Lock()
+
+    def emit(msg):
+        data = json.dumps(msg) + '\n'
+        with lock:
+            stream.write(data)
+            stream.flush()
+    return emit
+
+def serve_stdio(service):
+    out = sys.stdout
+    # 主进程里的打印也不能混进协议输出
+    sys.stdout = sys.stderr
+    emit = _line_writer(out)
+    pending = []
+    for line in sys.stdin:
+        if line.strip():
+            pending += service.handle(line, emit)
+        if service.stopped.is_set():
+            break
+    # 输入结束后把已提交的请求做完再退出
+    for f in pending:
+        f.exception()
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        stream = self.wfile
+
+        # 客户端提前断开时丢弃剩余的回写
+        def write(data):
+            try:
+                stream.write(data.encode('utf-8'))
+            except OSError:
+                pass
+
+        class _Out:
+            def write(self, data):
+                write(data)
+
+            def flush(self):
+                pass
+
+        emit = _line_writer(_Out())
+        pending = []
+        for raw in self.rfile:
+            line = raw.decode('utf-8')
+            if line.strip():
+                pending += service.handle(line, emit)
+            if service.stopped.is_set():
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                break
+        for f in pending:
+            f.exception()
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve_socket(service, path):
+    if os.path.exists(path):
+        os.unlink(path)
+    with _Server(path, _Handler) as server:
+        server.service = service
+        print(f"[service] listening on {path} with {service.workers} workers", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+# 客户端：发送一个请求，逐行产出服务的回复，直到该请求结束（done 或 error）
+def request(path, payload):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall((json.dumps(payload) + '\n').encode('utf-8'))
+        with sock.makefile('r', encoding='utf-8') as f:
+            for line in f:
+                msg = json.loads(line)
+                yield msg
+                if msg.get('done') or ('error' in msg and 'name' not in msg):
+                    return
+
+# 把实例文件交给正在运行的服务求解，结果按原实例顺序写成解文件
+def run_client(path, instances_path, algorithm, deadline, seed, output):
+    t = time.time()
+    instances = [dict(ins, items=list(ins['items'])) for ins in iter_instances(instances_path)]
+    payload = {'id': 1, 'algorithm': algorithm, 'deadline': deadline, 'seed': seed, 'instances': instances}
+    results = {}
+    for msg in request(path, payload):
+        if 'bins' in msg:
+            results[msg['name']] = msg
+            print(f"Instance: {msg['name']}\tBins Used: {msg['bins']} (Time: {msg['time']:.4f}s)")
+        elif 'error' in msg:
+            print(f"Instance: {msg.get('name')}\tError: {msg['error']}")
+    total = 0
+    with SolutionWriter(output) as writer:
+        for ins in instances:
+            if ins['name'] in results:
+                writer.write(ins, results[ins['name']]['solution'])
+                total += results[ins['name']]['bins']
+        writer.close(time.time() - t)
+    print(f"Total Used Bins: {total}")
+    print(f"Output saved to {output}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Persistent bin packing solver service')
+    parser.add_argument('--socket', default=None, help='serve on this Unix socket (default: stdin/stdout)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--connect', default=None, help='run as a client of the service at this socket')
+    parser.add_argument('--instances', default='CW_ins.json', help='client: instance file to send')
+    parser.add_argument('--algorithm', default='SA_2', choices=list(ALGORITHMS), help='client: algorithm')
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE, help='client: seconds per request')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='20513824_Yuanhao_Dai.json', help='client: solution file')
+    args = parser.parse_args()
+
+    if args.connect:
+        run_client(args.connect, args.instances, args.algorithm, args.deadline, args.seed, args.output)
+        return
+    service = SolverService(args.workers)
+    try:
+        if args.socket:
+            serve_socket(service, args.socket)
+        else:
+            serve_stdio(service)
+    finally:
+        service.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import time
+from collections import deque
+from bin_state import BinState
+from instrument import count
+
+# 禁忌表：哈希集合负责 O(1) 查询，定长环形队列负责按先进先出淘汰
+class TabuList:
+    __slots__ = ('size', 'ring', 'members')
+
+    def __init__(self, size):
+        self.size = size
+        self.ring = deque()
+        self.members = {}
+
+    def __contains__(self, move):
+        return move in self.members
+
+    def add(self, move):
+        if self.size <= 0:
+            return
+        self.ring.append(move)
+        self.members[move] = self.members.get(move, 0) + 1
+        if len(self.ring) > self.size:
+            old = self.ring.popleft()
+            left = self.members[old] - 1
+            if left:
+                self.members[old] = left
+            else:
+                del self.members[old]
+
+# 在邻域中找最佳单件移动 (i, p, j)：只算增量不拷贝解
+# 增量只可能是 -1（源箱子被清空）或 0，找到第一个 -1 即可直接返回
+# 评估过的候选（源物品, 目标箱子）个数在返回前一次性上报给 instrument
+def best_move(state, tabu):
+    contents, loads, capacity = state.contents, state.loads, state.capacity
+    alive = state.alive
+    evaluated = 0
+    # 只有单物品箱子才能产生 -1 的移动
+    for i in alive:
+        if len(contents[i]) != 1:
+            continue
+        item = contents[i][0]
+        for j in alive:
+            evaluated += 1
+            if j != i and loads[j] + item <= capacity and (i, j, item) not in tabu:
+                count('tabu.candidates', evaluated)
+                return i, 0, j
+    for i in alive:
+        seen = set()
+        for p, item in enumerate(contents[i]):
+            # 同一箱子里相同尺寸的物品对应同一个禁忌属性，只评估一次
+            if item in seen:
+                continue
+            seen.add(item)
+            for j in alive:
+                evaluated += 1
+                if j != i and loads[j] + item <= capacity and (i, j, item) not in tabu:
+                    count('tabu.candidates', evaluated)
+                    return i, p, j
+    count('tabu.candidates', evaluated)
+    return None
+
+# 检查点里的搜索状态：解按 to_bins() 的顺序保存，禁忌表里的箱子编号换成在其中的位置，
+# 指向已清空箱子的禁忌属性直接丢弃
+def _snapshot(state, best, tabu, it):
+    rank = {b: k for k, b in enumerate(sorted(state.alive))}
+    ring = [(rank[i], rank[j], item) for i, j, item in tabu.ring if i in rank and j in rank]
+    return {'bins': state.to_bins(), 'best': best, 'ring': ring, 'iters': it}
+
+# 禁忌搜索改进，箱子数达到 lower_bound（已证明最优）时立即停止
+# checkpoint 为 InstanceCheckpoint 时定期把当前解、最优解、禁忌表和迭代数存到 'tabu' 字段，续跑时从中恢复
+def tabu_search(bins, capacity, tabu_size=50, max_iters=500, time_limit=30, lower_bound=0, checkpoint=None):
+    saved = checkpoint.get('tabu') if checkpoint is not None else None
+    state = BinState(bins if saved is None else saved['bins'], capacity)
+    best = state.to_bins()
+    best_count = state.count()
+    tabu = TabuList(tabu_size)
+    done = 0
+    if saved is not None:
+        best, best_count, done = saved['best'], len(saved['best']), saved['iters']
+        for move in saved['ring']:
+            tabu.add(move)
+    start = time.time()
+    for it in range(done, max_iters):
+        if time.time() - start > time_limit:
+            break
+        if checkpoint is not None and checkpoint.due():
+            checkpoint.update(tabu=_snapshot(state, best, tabu, it))
+        if state.count() < 2 or best_count <= lower_bound:
+            break
+        move = best_move(state, tabu)
+        if move is None:
+            break
+        count('tabu.moves')
+        i, p, j = move
+        item = state.contents[i][p]
+        # 只执行选中的移动，并禁止把物品立刻移回去
+        state.move(i, p, j)
+        tabu.add((j, i, item))
+        # 更新全局最优
+        if state.count() < best_count:
+            best = state.to_bins()
+            best_count = state.count()
+    if checkpoint is not None:
+        checkpoint.discard('tabu')
+    return best
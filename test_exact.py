@@ -0,0 +1,55 @@
+import random
+from collections import Counter
+from exact import exact_solve
+
+# exact.exact_solve 的交叉检验：小实例与子集状态压缩 DP 的最优箱子数对照，另有一个需要上千个箱子的大实例
+# python -m pytest test_exact.py，或直接 python test_exact.py
+
+# 状态压缩 DP：best[mask] = (已用箱子数, 最后一个箱子的负载)，按字典序取最小
+def bitmask_optimum(items, capacity):
+    n = len(items)
+    best = [None] * (1 << n)
+    best[0] = (1, 0)
+    for mask in range(1 << n):
+        if best[mask] is None:
+            continue
+        bins, load = best[mask]
+        for i in range(n):
+            if mask >> i & 1:
+                continue
+            if load + items[i] <= capacity:
+                nxt = (bins, load + items[i])
+            else:
+                nxt = (bins + 1, items[i])
+            m = mask | 1 << i
+            if best[m] is None or nxt < best[m]:
+                best[m] = nxt
+    return best[-1][0] if n else 0
+
+def check_solution(solution, items, capacity):
+    assert Counter(x for b in solution for x in b) == Counter(items)
+    assert all(0 < sum(b) <= capacity for b in solution)
+
+def test_matches_bitmask_dp():
+    rng = random.Random(1)
+    for _ in range(400):
+        capacity = rng.randint(5, 32)
+        items = [rng.randint(1, capacity) for _ in range(rng.randint(1, 11))]
+        solution, proven = exact_solve(items, capacity, time_limit=10)
+        assert proven
+        check_solution(solution, items, capacity)
+        assert len(solution) == bitmask_optimum(items, capacity)
+
+# 需要约 3000 个箱子、BFD 不是最优的实例：搜索深度远超 Python 默认递归深度
+def test_more_than_1000_bins():
+    rng = random.Random(3)
+    items = [rng.choice([5, 6, 7, 9, 10, 11]) for _ in range(6000)]
+    solution, proven = exact_solve(items, 16, time_limit=30)
+    check_solution(solution, items, 16)
+    assert len(solution) > 1000
+    assert proven
+
+if __name__ == '__main__':
+    test_matches_bitmask_dp()
+    test_more_than_1000_bins()
+    print('ok')
@@ -0,0 +1,47 @@
+import random
+from histogram import Histogram, pattern_best_fit, pattern_first_fit, pattern_next_fit
+from packing import best_fit, first_fit, next_fit
+
+# histogram 的按段 / 按组解码器与 packing 里逐个物品的解码器对照：箱子序列必须一致（箱内物品顺序除外）
+# python -m pytest test_histogram.py，或直接 python test_histogram.py
+
+DECODERS = [(pattern_best_fit, best_fit), (pattern_first_fit, first_fit), (pattern_next_fit, next_fit)]
+
+def random_instance(rng):
+    capacity = rng.randint(2, 20)
+    sizes = rng.sample(range(1, capacity + 1), rng.randint(1, min(capacity, 5)))
+    items = [rng.choice(sizes) for _ in range(rng.randint(1, 60))]
+    # 一半的实例部分排序，让相同尺寸连成较长的段
+    if rng.random() < 0.5:
+        items.sort(key=lambda x: (x // 3, rng.random()))
+    return items, capacity
+
+def same_bins(groups, hist, expected):
+    return [sorted(b) for b in hist.expand(groups)] == [sorted(b) for b in expected]
+
+def test_matches_item_decoders():
+    rng = random.Random(1)
+    for _ in range(2000):
+        items, capacity = random_instance(rng)
+        hist = Histogram(items)
+        runs = hist.runs(items)
+        assert sum(c for _, c in runs) == len(items)
+        for pattern_decoder, decoder in DECODERS:
+            groups = pattern_decoder(runs, hist.sizes, capacity)
+            assert same_bins(groups, hist, decoder(items, capacity)), (pattern_decoder.__name__, items, capacity)
+
+def test_decreasing_matches_sorted_order():
+    rng = random.Random(2)
+    for _ in range(500):
+        items, capacity = random_instance(rng)
+        hist = Histogram(items)
+        order = sorted(items, reverse=True)
+        assert hist.runs(order) == hist.decreasing()
+        for pattern_decoder, decoder in DECODERS:
+            groups = pattern_decoder(hist.decreasing(), hist.sizes, capacity)
+            assert same_bins(groups, hist, decoder(order, capacity))
+
+if __name__ == '__main__':
+    test_matches_item_decoders()
+    test_decreasing_matches_sorted_order()
+    print('ok')
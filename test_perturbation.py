@@ -0,0 +1,40 @@
+import random
+from collections import Counter
+from bin_state import BinState
+from perturbation import PERTURBATIVE, ruin_recreate
+
+# perturbation 里各扰动 LLH 的检验：解始终合法、箱子数不增加，被撤销的毁坏重建不留下多余的箱子
+# python -m pytest test_perturbation.py
+
+def test_rejected_ruin_recreate_leaves_no_bins():
+    # 最空的两个箱子 [5,3,2] 和 [4,3,3] 按尺寸递减 Best Fit 放回需要 3 个箱子，只能撤销
+    bins = [[5, 3, 2], [4, 3, 3], [10], [10]]
+    state = BinState(bins, 10)
+    assert ruin_recreate(state, k=2) == (0, 0)
+    assert len(state.contents) == len(bins)
+    assert state.count() == len(bins)
+    assert sorted(map(sorted, state.to_bins())) == sorted(map(sorted, bins))
+
+def test_moves_keep_solution_valid():
+    rng = random.Random(2)
+    random.seed(2)
+    for _ in range(50):
+        capacity = rng.randint(10, 50)
+        items = [rng.randint(1, capacity) for _ in range(rng.randint(5, 60))]
+        state = BinState([[x] for x in items], capacity)
+        size = len(state.contents)
+        count = state.count()
+        for _ in range(500):
+            delta, _ = random.choice(PERTURBATIVE)(state)
+            assert delta <= 0
+            count += delta
+            assert state.count() == count
+        assert len(state.contents) == size
+        bins = state.to_bins()
+        assert Counter(x for b in bins for x in b) == Counter(items)
+        assert all(sum(b) <= capacity for b in bins)
+
+if __name__ == '__main__':
+    test_rejected_ruin_recreate_leaves_no_bins()
+    test_moves_keep_solution_valid()
+    print('ok')
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+# solver_service 的 stdio 协议：格式不对的请求只得到一条错误回复，服务继续处理后面的请求
+# python -m pytest test_solver_service.py
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver_service.py')
+INSTANCE = {'name': 'tiny', 'capacity': 10, 'items': [6, 5, 4, 3, 2]}
+
+def serve(lines):
+    proc = subprocess.run([sys.executable, SCRIPT, '--workers', '1'], input=''.join(l + '\n' for l in lines),
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    return [json.loads(line) for line in proc.stdout.splitlines()]
+
+def test_bad_request_does_not_stop_service():
+    replies = serve([
+        json.dumps({'id': 1, 'algorithm': 'bext_fit', 'deadline': 'soon', 'instances': [INSTANCE]}),
+        json.dumps([1, 2]),
+        json.dumps({'id': 3, 'algorithm': 'bext_fit', 'deadline': 5, 'instances': [{'name': 'x', 'capacity': 10}]}),
+        json.dumps({'id': 4, 'algorithm': 'bext_fit', 'deadline': 5, 'seed': 'abc', 'instances': [INSTANCE]}),
+        json.dumps({'id': 5, 'algorithm': 'bext_fit', 'deadline': 5, 'instances': [INSTANCE]}),
+    ])
+    errors = {r['id']: r['error'] for r in replies if 'error' in r}
+    assert set(errors) == {1, None, 3, 4}
+    assert 'deadline' in errors[1] and 'items' in errors[3] and 'seed' in errors[4]
+    solved = [r for r in replies if r.get('id') == 5 and 'bins' in r]
+    assert len(solved) == 1 and solved[0]['bins'] == 2
+    assert {'id': 5, 'done': True, 'solved': 1, 'failed': 0} in replies
+
+if __name__ == '__main__':
+    test_bad_request_does_not_stop_service()
+    print('ok')